@@ -0,0 +1,219 @@
+"""Замеры сериализации социальной сети на синтетических данных (см. generator.py).
+
+Запуск:
+    python benchmark.py serializers [--users 5000] [--output results.json] [--baseline old.json]
+    python benchmark.py compression [--users 2000]
+
+serializers - время, пиковая память и скорость (записей/с) для каждого пути
+сохранения и загрузки. С --baseline результаты сравниваются с прошлым
+запуском, и при замедлении больше --tolerance процесс завершается с кодом 1.
+compression - размер и скорость записи/загрузки для каждого кодека сжатия;
+скорость считается по несжатому объему, чтобы кодеки можно было сравнивать.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from generator import DISTRIBUTIONS, generate_data
+from main import COMPRESSIONS, SocialNetwork, SocialNetworkSerializer
+from storage_sqlite import SQLiteStorage
+
+# Формат -> (сохранение, загрузка, расширение)
+FORMATS = {
+    'json': (SocialNetworkSerializer.save_to_json, SocialNetworkSerializer.load_from_json, '.json'),
+    'jsonl': (SocialNetworkSerializer.save_to_jsonl, SocialNetworkSerializer.load_from_jsonl, '.jsonl'),
+    'xml': (SocialNetworkSerializer.save_to_xml, SocialNetworkSerializer.load_from_xml, '.xml'),
+}
+CODECS = ('none', *COMPRESSIONS)
+
+
+def _timed(function, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def _peak_memory(function, *args, **kwargs) -> int:
+    """Пик выделенной памяти за вызов; отдельный прогон, т.к. tracemalloc замедляет код"""
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _sqlite_save(sn: SocialNetwork, path: str):
+    if os.path.exists(path):
+        os.remove(path)
+    storage = SQLiteStorage(path)
+    try:
+        storage.save(sn)
+    finally:
+        storage.close()
+
+
+def _sqlite_load(path: str):
+    storage = SQLiteStorage(path)
+    try:
+        network = storage.open_network()
+        # Ленивая сеть: считаем загрузкой чтение всех записей
+        for table in (network.users, network.posts, network.comments):
+            for _ in table.values():
+                pass
+        network.close()
+    finally:
+        storage.close()
+
+
+def serialization_paths(directory: str, data: dict) -> dict:
+    """Путь сериализации -> (сохранение(sn), загрузка()); dict - to_dict/from_dict в памяти"""
+    def path(name: str) -> str:
+        return os.path.join(directory, name)
+
+    return {
+        'dict': (lambda sn: sn.to_dict(), lambda: SocialNetwork.from_dict(data)),
+        'json': (lambda sn: SocialNetworkSerializer.save_to_json(sn, path('network.json')),
+                 lambda: SocialNetworkSerializer.load_from_json(path('network.json'))),
+        'json-compact': (lambda sn: SocialNetworkSerializer.save_to_json(sn, path('compact.json'), indent=None),
+                         lambda: SocialNetworkSerializer.load_from_json(path('compact.json'))),
+        'jsonl': (lambda sn: SocialNetworkSerializer.save_to_jsonl(sn, path('network.jsonl')),
+                  lambda: SocialNetworkSerializer.load_from_jsonl(path('network.jsonl'))),
+        'xml': (lambda sn: SocialNetworkSerializer.save_to_xml(sn, path('network.xml')),
+                lambda: SocialNetworkSerializer.load_from_xml(path('network.xml'))),
+        'binary': (lambda sn: SocialNetworkSerializer.save_to_binary(sn, path('network.bin')),
+                   lambda: SocialNetworkSerializer.load_from_binary(path('network.bin'))),
+        'shards': (lambda sn: SocialNetworkSerializer.save_to_shards(sn, path('shards')),
+                   lambda: SocialNetworkSerializer.load_from_shards(path('shards'))),
+        'sqlite': (lambda sn: _sqlite_save(sn, path('network.db')),
+                   lambda: _sqlite_load(path('network.db'))),
+    }
+
+
+def serializer_benchmark(data: dict, directory: str, repeat: int = 3) -> list[dict]:
+    """Замеры всех путей сохранения/загрузки; время - лучшее из repeat попыток"""
+    sn = SocialNetwork.from_dict(data)
+    records = len(sn.users) + len(sn.posts) + len(sn.comments) + len(sn.graph)
+
+    results = []
+
+    def add(path_name: str, operation: str, function, *args):
+        seconds = min(_timed(function, *args) for _ in range(repeat))
+        results.append({
+            'path': path_name,
+            'operation': operation,
+            'seconds': seconds,
+            'peak_mb': _peak_memory(function, *args) / 2 ** 20,
+            'records_per_s': records / seconds if seconds else float('inf'),
+        })
+
+    for path_name, (save, load) in serialization_paths(directory, data).items():
+        add(path_name, 'save', save, sn)
+        add(path_name, 'load', load)
+    return results
+
+
+def compression_benchmark(sn: SocialNetwork, directory: str, repeat: int = 3) -> list[dict]:
+    """Замеры для каждого формата и кодека; время - лучшее из repeat попыток"""
+    results = []
+    for format_name, (save, load, extension) in FORMATS.items():
+        raw_size = None
+        for codec in CODECS:
+            path = os.path.join(directory, f"snapshot-{codec}{extension}")
+            write_time = min(_timed(save, sn, path, compression=codec) for _ in range(repeat))
+            load_time = min(_timed(load, path, compression=codec) for _ in range(repeat))
+            size = os.path.getsize(path)
+            if raw_size is None:
+                raw_size = size
+            results.append({
+                'format': format_name,
+                'codec': codec,
+                'size': size,
+                'ratio': raw_size / size,
+                'write_mb_s': raw_size / write_time / 2 ** 20,
+                'load_mb_s': raw_size / load_time / 2 ** 20,
+            })
+            os.remove(path)
+    return results
+
+
+def compare_with_baseline(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """Замедления относительно прошлого запуска больше чем на tolerance (доля)"""
+    previous = {(row['path'], row['operation']): row['seconds'] for row in baseline}
+    regressions = []
+    for row in results:
+        old = previous.get((row['path'], row['operation']))
+        if old and row['seconds'] > old * (1 + tolerance):
+            regressions.append(f"{row['path']} {row['operation']}: {old:.3f} с -> {row['seconds']:.3f} с "
+                               f"(+{(row['seconds'] / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_serializer_table(results: list[dict]):
+    print(f"{'путь':<14}{'операция':<10}{'время, с':>10}{'пик, МБ':>10}{'записей/с':>12}")
+    for row in results:
+        print(f"{row['path']:<14}{row['operation']:<10}{row['seconds']:>10.3f}"
+              f"{row['peak_mb']:>10.1f}{row['records_per_s']:>12.0f}")
+
+
+def print_compression_table(results: list[dict]):
+    print(f"{'формат':<7}{'кодек':<7}{'размер, КБ':>12}{'сжатие':>8}{'запись, МБ/с':>14}{'загрузка, МБ/с':>16}")
+    for row in results:
+        print(f"{row['format']:<7}{row['codec']:<7}{row['size'] / 1024:>12.1f}{row['ratio']:>8.2f}"
+              f"{row['write_mb_s']:>14.2f}{row['load_mb_s']:>16.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры сериализации социальной сети")
+    parser.add_argument('suite', nargs='?', choices=('serializers', 'compression'), default='serializers')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--posts-per-user', type=float, default=5)
+    parser.add_argument('--comments-per-post', type=float, default=3)
+    parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='pareto')
+    parser.add_argument('--text-words', type=int, nargs=2, default=(5, 30), metavar=('MIN', 'MAX'))
+    parser.add_argument('--follows-per-user', type=float, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="куда сохранить результаты в JSON")
+    parser.add_argument('--baseline', help="результаты прошлого запуска для сравнения")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="допустимое замедление (доля)")
+    args = parser.parse_args()
+
+    data = generate_data(
+        args.users, args.seed,
+        posts_per_user=args.posts_per_user, posts_distribution=args.distribution,
+        comments_per_post=args.comments_per_post, comments_distribution=args.distribution,
+        text_words=tuple(args.text_words), follows_per_user=args.follows_per_user,
+    )
+    print(f"Сеть (seed={args.seed}): {len(data['users'])} пользователей, {len(data['posts'])} постов, "
+          f"{len(data['comments'])} комментариев, {len(data.get('follows', ()))} подписок\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.suite == 'compression':
+            results = compression_benchmark(SocialNetwork.from_dict(data), directory, args.repeat)
+            print_compression_table(results)
+        else:
+            results = serializer_benchmark(data, directory, args.repeat)
+            print_serializer_table(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'suite': args.suite, 'args': vars(args), 'results': results}, f, indent=2)
+
+    if args.baseline and args.suite == 'serializers':
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_with_baseline(results, json.load(f)['results'], args.tolerance)
+        if regressions:
+            print("\n❌ Замедления относительно базового запуска:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\n✅ Замедлений относительно базового запуска нет")
+
+
+if __name__ == "__main__":
+    main()
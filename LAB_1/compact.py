@@ -0,0 +1,321 @@
+"""Компактное представление сущностей социальной сети.
+
+Классы со __slots__ вместо __dict__, время хранится целым числом
+микросекунд, а связи - массивами id, которые превращаются в объекты
+только при обращении к атрибутам posts/comments.
+"""
+import tracemalloc
+from array import array
+from datetime import datetime
+
+from main import (
+    SocialNetwork, SocialNetworkError, ValidationError,
+    _to_epoch_us, _from_epoch_us
+)
+
+
+def _append_id(ids: array | None, value: int) -> array:
+    """Добавление id; массив создается только при первой связи"""
+    if ids is None:
+        ids = array('q')
+    ids.append(value)
+    return ids
+
+
+def _remove_id(ids: array | None, value: int) -> array | None:
+    """Удаление одного вхождения id; собирается новый массив, старый мог читать снимок"""
+    if not ids or value not in ids:
+        return ids
+    ids = array('q', ids)
+    ids.remove(value)
+    return ids
+
+
+def _resolve(ids: array | None, table: dict, network) -> list:
+    """Ленивое восстановление объектов по массиву id"""
+    if not ids:
+        return []
+    if network is None:
+        raise SocialNetworkError("Объект не привязан к социальной сети")
+    return [table[i] for i in ids]
+
+
+class CompactUser:
+    __slots__ = ('user_id', 'username', 'email', '_registered_us',
+                 '_post_ids', '_comment_ids', '_network')
+
+    def __init__(self, user_id: int, username: str, email: str):
+        self.validate(username, email)
+
+        self.user_id = user_id
+        self.username = username
+        self.email = email
+        self._registered_us = _to_epoch_us(datetime.now())
+        self._post_ids = None
+        self._comment_ids = None
+        self._network = None
+
+    def validate(self, username: str, email: str):
+        """Валидация пользователя"""
+        if not username:
+            raise ValidationError("Пользователь не содержит имя")
+        if not email:
+            raise ValidationError("Пользователь не содержит email")
+
+    @property
+    def data_registration(self) -> datetime:
+        return _from_epoch_us(self._registered_us)
+
+    @data_registration.setter
+    def data_registration(self, value: datetime):
+        self._registered_us = _to_epoch_us(value)
+
+    @property
+    def posts(self) -> list:
+        network = self._network
+        return _resolve(self._post_ids, network.posts if network else None, network)
+
+    @property
+    def comments(self) -> list:
+        network = self._network
+        return _resolve(self._comment_ids, network.comments if network else None, network)
+
+    def add_post(self, post: 'CompactPost'):
+        self._post_ids = _append_id(self._post_ids, post.post_id)
+
+    def add_comment(self, comment: 'CompactComment'):
+        self._comment_ids = _append_id(self._comment_ids, comment.comment_id)
+
+    def remove_post(self, post: 'CompactPost'):
+        self._post_ids = _remove_id(self._post_ids, post.post_id)
+
+    def remove_comment(self, comment: 'CompactComment'):
+        self._comment_ids = _remove_id(self._comment_ids, comment.comment_id)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CompactUser':
+        """Десериализация"""
+        user = cls(
+            data['user_id'],
+            data['username'],
+            data['email']
+        )
+        user.data_registration = datetime.fromisoformat(data['data_registration'])
+        return user
+
+    @classmethod
+    def from_trusted_dict(cls, data: dict) -> 'CompactUser':
+        """Десериализация собственного снимка без валидации"""
+        user = cls.__new__(cls)
+        user.user_id = data['user_id']
+        user.username = data['username']
+        user.email = data['email']
+        user._registered_us = _to_epoch_us(datetime.fromisoformat(data['data_registration']))
+        user._post_ids = None
+        user._comment_ids = None
+        user._network = None
+        return user
+
+    def to_dict(self) -> dict:
+        """Преобразование в словарь для сериализации"""
+        return {
+            'user_id': self.user_id,
+            'username': self.username,
+            'email': self.email,
+            'data_registration': self.data_registration.isoformat(),
+            'posts': list(self._post_ids or ()),
+            'comments': list(self._comment_ids or ())
+        }
+
+    def __str__(self):
+        return f"User({self.user_id}): {self.username}"
+
+
+class CompactPost:
+    __slots__ = ('post_id', 'user_id', 'text', '_created_us', '_comment_ids', '_network')
+
+    def __init__(self, post_id: int, user_id: int, text: str):
+        self.validate(text)
+
+        self.post_id = post_id
+        self.user_id = user_id
+        self.text = text
+        self._created_us = _to_epoch_us(datetime.now())
+        self._comment_ids = None
+        self._network = None
+
+    def validate(self, text: str):
+        """Валидация поста"""
+        if not text:
+            raise ValidationError("Пост не содержит текст")
+
+    @property
+    def created_at(self) -> datetime:
+        return _from_epoch_us(self._created_us)
+
+    @created_at.setter
+    def created_at(self, value: datetime):
+        self._created_us = _to_epoch_us(value)
+
+    @property
+    def comments(self) -> list:
+        network = self._network
+        return _resolve(self._comment_ids, network.comments if network else None, network)
+
+    def add_comment(self, comment: 'CompactComment'):
+        self._comment_ids = _append_id(self._comment_ids, comment.comment_id)
+
+    def remove_comment(self, comment: 'CompactComment'):
+        self._comment_ids = _remove_id(self._comment_ids, comment.comment_id)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CompactPost':
+        """Десериализация"""
+        post = cls(
+            data['post_id'],
+            data['user_id'],
+            data['text']
+        )
+        post.created_at = datetime.fromisoformat(data['created_at'])
+        return post
+
+    @classmethod
+    def from_trusted_dict(cls, data: dict) -> 'CompactPost':
+        """Десериализация собственного снимка без валидации"""
+        post = cls.__new__(cls)
+        post.post_id = data['post_id']
+        post.user_id = data['user_id']
+        post.text = data['text']
+        post._created_us = _to_epoch_us(datetime.fromisoformat(data['created_at']))
+        post._comment_ids = None
+        post._network = None
+        return post
+
+    def to_dict(self) -> dict:
+        """Преобразование в словарь для сериализации"""
+        return {
+            'post_id': self.post_id,
+            'user_id': self.user_id,
+            'text': self.text,
+            'created_at': self.created_at.isoformat(),
+            'comments': list(self._comment_ids or ())
+        }
+
+    def __str__(self):
+        text_preview = self.text[:50] + "..." if len(self.text) > 50 else self.text
+        return f"Post({self.post_id}): {text_preview}"
+
+
+class CompactComment:
+    __slots__ = ('comment_id', 'user_id', 'post_id', 'text', '_created_us')
+
+    def __init__(self, comment_id: int, user_id: int, post_id: int, text: str):
+        self.validate(text)
+
+        self.comment_id = comment_id
+        self.user_id = user_id
+        self.post_id = post_id
+        self.text = text
+        self._created_us = _to_epoch_us(datetime.now())
+
+    def validate(self, text: str):
+        """Валидация комментария"""
+        if not text:
+            raise ValidationError("Комментарии не содержат текст")
+
+    @property
+    def created_at(self) -> datetime:
+        return _from_epoch_us(self._created_us)
+
+    @created_at.setter
+    def created_at(self, value: datetime):
+        self._created_us = _to_epoch_us(value)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CompactComment':
+        """Десериализация"""
+        comment = cls(
+            data['comment_id'],
+            data['user_id'],
+            data['post_id'],
+            data['text']
+        )
+        comment.created_at = datetime.fromisoformat(data['created_at'])
+        return comment
+
+    @classmethod
+    def from_trusted_dict(cls, data: dict) -> 'CompactComment':
+        """Десериализация собственного снимка без валидации"""
+        comment = cls.__new__(cls)
+        comment.comment_id = data['comment_id']
+        comment.user_id = data['user_id']
+        comment.post_id = data['post_id']
+        comment.text = data['text']
+        comment._created_us = _to_epoch_us(datetime.fromisoformat(data['created_at']))
+        return comment
+
+    def to_dict(self) -> dict:
+        """Преобразование в словарь для сериализации"""
+        return {
+            'comment_id': self.comment_id,
+            'user_id': self.user_id,
+            'post_id': self.post_id,
+            'text': self.text,
+            'created_at': self.created_at.isoformat()
+        }
+
+    def __str__(self):
+        return f"Comment({self.comment_id}): {self.text[:30]}..."
+
+
+class CompactSocialNetwork(SocialNetwork):
+    """Социальная сеть на компактных сущностях с тем же интерфейсом"""
+    user_class = CompactUser
+    post_class = CompactPost
+    comment_class = CompactComment
+
+    def _store_user(self, user: CompactUser):
+        user._network = self
+        super()._store_user(user)
+
+    def _store_post(self, post: CompactPost):
+        post._network = self
+        super()._store_post(post)
+
+
+def _measure(network_class: type, users: int, posts_per_user: int, comments_per_post: int):
+    """Пиковая память и размер графа объектов для одного класса сети"""
+    tracemalloc.start()
+    sn = network_class()
+    post_id = comment_id = 0
+    for user_id in range(users):
+        sn.add_user(user_id, f"user_{user_id}", f"user_{user_id}@example.com")
+    for user_id in range(users):
+        for _ in range(posts_per_user):
+            post_id += 1
+            sn.add_post(post_id, user_id, "Текст поста")
+            for i in range(comments_per_post):
+                comment_id += 1
+                sn.add_comment(comment_id, (user_id + i) % users, post_id, "Комментарий")
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak, len(sn.users) + len(sn.posts) + len(sn.comments)
+
+
+def compare_memory(users: int = 10_000, posts_per_user: int = 5, comments_per_post: int = 10):
+    """Сравнение памяти обычных и компактных сущностей"""
+    print(f"Пользователей: {users}, постов: {users * posts_per_user}, "
+          f"комментариев: {users * posts_per_user * comments_per_post}")
+    results = {}
+    for network_class in (SocialNetwork, CompactSocialNetwork):
+        current, peak, objects = _measure(network_class, users, posts_per_user, comments_per_post)
+        results[network_class.__name__] = current
+        print(f"{network_class.__name__:>22}: {current / 2**20:8.1f} МБ "
+              f"(пик {peak / 2**20:.1f} МБ, {current / objects:.0f} байт на объект)")
+    ratio = results['SocialNetwork'] / results['CompactSocialNetwork']
+    print(f"Экономия памяти: в {ratio:.2f} раза")
+    return results
+
+
+if __name__ == "__main__":
+    compare_memory()
@@ -0,0 +1,110 @@
+"""Генератор синтетических социальных сетей для замеров.
+
+Сеть полностью определяется параметрами и seed: одинаковые аргументы дают
+одинаковые id, тексты, даты и подписки. generate_data возвращает словарь в
+формате SocialNetwork.to_dict, поэтому его можно подавать прямо в from_dict.
+"""
+import random
+from datetime import datetime, timedelta
+
+from main import SocialNetwork
+
+# Отсчет дат, чтобы они не зависели от момента запуска
+_START = datetime(2024, 1, 1)
+_YEAR_SECONDS = 365 * 24 * 3600
+
+_WORDS = (
+    "сегодня", "погода", "прогулка", "парк", "новости", "работа", "друзья", "кофе", "город",
+    "музыка", "книга", "фильм", "выходные", "проект", "идея", "отпуск", "море", "горы",
+    "python", "код", "релиз", "тест", "данные", "сеть", "пост", "отличный", "интересный",
+    "новый", "первый", "вечер", "утро", "спасибо", "согласен", "вопрос", "ответ", "фото",
+)
+
+DISTRIBUTIONS = ('fixed', 'uniform', 'pareto')
+
+# Параметр формы распределения Парето: тяжелый хвост, как у активности в соцсетях
+_PARETO_ALPHA = 1.5
+
+
+def _count(rng: random.Random, mean: float, distribution: str) -> int:
+    """Случайное количество с заданным средним"""
+    if distribution == 'fixed':
+        return round(mean)
+    if distribution == 'uniform':
+        return rng.randint(0, round(2 * mean))
+    if distribution == 'pareto':
+        scale = mean * (_PARETO_ALPHA - 1) / _PARETO_ALPHA
+        return int(rng.paretovariate(_PARETO_ALPHA) * scale)
+    raise ValueError(f"Неизвестное распределение: {distribution}")
+
+
+def _text(rng: random.Random, words: tuple[int, int]) -> str:
+    return ' '.join(rng.choices(_WORDS, k=rng.randint(*words))).capitalize()
+
+
+def _timestamp(rng: random.Random, after: datetime) -> datetime:
+    """Случайный момент в течение года после after"""
+    return after + timedelta(seconds=rng.randrange(_YEAR_SECONDS))
+
+
+def generate_data(users: int = 1000, seed: int = 0,
+                  posts_per_user: float = 5, posts_distribution: str = 'pareto',
+                  comments_per_post: float = 3, comments_distribution: str = 'pareto',
+                  text_words: tuple[int, int] = (5, 30), follows_per_user: float = 0) -> dict:
+    """Словарь сети в формате to_dict.
+
+    posts_per_user и comments_per_post - средние значения, распределение
+    ('fixed', 'uniform' или 'pareto') задается отдельно. text_words -
+    диапазон длины текстов в словах. Авторы комментариев и подписки
+    выбираются случайно среди всех пользователей.
+    """
+    rng = random.Random(seed)
+    data = {'users': {}, 'posts': {}, 'comments': {}}
+    registered = []
+
+    for user_id in range(users):
+        data_registration = _timestamp(rng, _START)
+        registered.append(data_registration)
+        data['users'][user_id] = {
+            'user_id': user_id,
+            'username': f"user_{user_id}",
+            'email': f"user_{user_id}@example.com",
+            'data_registration': data_registration.isoformat(),
+        }
+
+    post_id = comment_id = 0
+    for user_id in range(users):
+        for _ in range(_count(rng, posts_per_user, posts_distribution)):
+            created_at = _timestamp(rng, registered[user_id])
+            data['posts'][post_id] = {
+                'post_id': post_id,
+                'user_id': user_id,
+                'text': _text(rng, text_words),
+                'created_at': created_at.isoformat(),
+            }
+            for _ in range(_count(rng, comments_per_post, comments_distribution)):
+                data['comments'][comment_id] = {
+                    'comment_id': comment_id,
+                    'user_id': rng.randrange(users),
+                    'post_id': post_id,
+                    'text': _text(rng, text_words),
+                    'created_at': _timestamp(rng, created_at).isoformat(),
+                }
+                comment_id += 1
+            post_id += 1
+
+    if follows_per_user and users > 1:
+        follows = set()
+        for follower_id in range(users):
+            for _ in range(_count(rng, follows_per_user, 'uniform')):
+                followee_id = rng.randrange(users)
+                if followee_id != follower_id:
+                    follows.add((follower_id, followee_id))
+        data['follows'] = [list(edge) for edge in sorted(follows)]
+
+    return data
+
+
+def generate_network(users: int = 1000, seed: int = 0, network_class: type = None, **options) -> SocialNetwork:
+    """Сеть из generate_data; options - остальные параметры generate_data"""
+    return (network_class or SocialNetwork).from_dict(generate_data(users, seed, **options))
@@ -0,0 +1,275 @@
+"""Граф подписок между пользователями социальной сети.
+
+Подписки хранятся в компактном формате CSR (compressed sparse row):
+отсортированный массив id вершин, массив смещений и общий массив
+соседей - без отдельного множества или списка на каждого пользователя.
+Изменения после последнего freeze() копятся в небольшой дельте
+(добавленные и удаленные подписки по вершинам) и вливаются в CSR при
+freeze(): явно или сами, когда дельта вырастает. Загрузчики строят CSR
+сразу из списка ребер через from_edges/add_edges.
+"""
+from array import array
+from bisect import bisect_left
+from statistics import median
+
+# Дельта вливается в CSR, когда в ней больше max(_DELTA_LIMIT, ребер / 2) изменений
+_DELTA_LIMIT = 4096
+
+_EMPTY_CSR = (array('q'), array('q', [0]), array('q'), array('q', [0]), array('q'))
+
+
+def _build_rows(nodes: array, pairs: list[tuple[int, int]]) -> tuple[array, array]:
+    """Смещения и соседи по парам (вершина, сосед), отсортированным и без повторов"""
+    offsets = array('q', [0])
+    targets = array('q', [target for _, target in pairs])
+    i = 0
+    for node in nodes:
+        while i < len(pairs) and pairs[i][0] == node:
+            i += 1
+        offsets.append(i)
+    return offsets, targets
+
+
+class FollowerGraph:
+    def __init__(self):
+        # Основное представление (CSR): вершины, смещения и соседи исходящих и входящих ребер
+        self._csr = _EMPTY_CSR
+        # Дельта после последнего freeze: user_id -> множество id
+        self._added_out: dict[int, set[int]] = {}
+        self._added_in: dict[int, set[int]] = {}
+        self._removed_out: dict[int, set[int]] = {}
+        self._removed_in: dict[int, set[int]] = {}
+        # id строк дельты, которые можно менять на месте (остальные общие с копиями)
+        self._owned: set[int] = set()
+        self._changes = 0
+        self._edges = 0
+
+    def __len__(self):
+        """Количество подписок (ребер)"""
+        return self._edges
+
+    @property
+    def frozen(self) -> bool:
+        """Все подписки уже в CSR"""
+        return not self._changes
+
+    @classmethod
+    def from_edges(cls, edges) -> 'FollowerGraph':
+        """Граф из пар (follower_id, followee_id) сразу в CSR; повторы отбрасываются"""
+        out_pairs = sorted({(follower_id, followee_id) for follower_id, followee_id in edges})
+        in_pairs = sorted((followee_id, follower_id) for follower_id, followee_id in out_pairs)
+        nodes = array('q', sorted({pair[0] for pair in out_pairs} | {pair[0] for pair in in_pairs}))
+
+        graph = cls()
+        graph._csr = (nodes, *_build_rows(nodes, out_pairs), *_build_rows(nodes, in_pairs))
+        graph._edges = len(out_pairs)
+        return graph
+
+    def add_edges(self, edges):
+        """Пакетное добавление подписок (загрузчики): пустой граф строится сразу в CSR"""
+        if self._edges or self._changes:
+            for follower_id, followee_id in edges:
+                self.follow(follower_id, followee_id)
+            return
+        graph = self.from_edges(edges)
+        self._csr, self._edges = graph._csr, graph._edges
+
+    def copy(self) -> 'FollowerGraph':
+        """Копия графа; CSR неизменяем, строки дельты общие и копируются при первом изменении"""
+        graph = FollowerGraph()
+        graph._csr = self._csr
+        graph._added_out = dict(self._added_out)
+        graph._added_in = dict(self._added_in)
+        graph._removed_out = dict(self._removed_out)
+        graph._removed_in = dict(self._removed_in)
+        self._owned = set()
+        graph._changes = self._changes
+        graph._edges = self._edges
+        return graph
+
+    def follow(self, follower_id: int, followee_id: int) -> bool:
+        """Добавление подписки за O(log d); False, если она уже была"""
+        if self.is_following(follower_id, followee_id):
+            return False
+        removed = self._removed_out.get(follower_id)
+        if removed is not None and followee_id in removed:
+            # Подписка есть в CSR: достаточно отменить ее удаление
+            self._discard(self._removed_out, follower_id, followee_id)
+            self._discard(self._removed_in, followee_id, follower_id)
+            self._changes -= 1
+        else:
+            self._delta_row(self._added_out, follower_id).add(followee_id)
+            self._delta_row(self._added_in, followee_id).add(follower_id)
+            self._changes += 1
+        self._edges += 1
+        self._compact_delta()
+        return True
+
+    def unfollow(self, follower_id: int, followee_id: int) -> bool:
+        """Удаление подписки за O(log d); False, если ее не было"""
+        if not self.is_following(follower_id, followee_id):
+            return False
+        added = self._added_out.get(follower_id)
+        if added is not None and followee_id in added:
+            self._discard(self._added_out, follower_id, followee_id)
+            self._discard(self._added_in, followee_id, follower_id)
+            self._changes -= 1
+        else:
+            self._delta_row(self._removed_out, follower_id).add(followee_id)
+            self._delta_row(self._removed_in, followee_id).add(follower_id)
+            self._changes += 1
+        self._edges -= 1
+        self._compact_delta()
+        return True
+
+    def _delta_row(self, adjacency: dict[int, set[int]], node: int) -> set[int]:
+        """Строка дельты для изменения; общая с копией строка сначала копируется"""
+        row = adjacency.get(node)
+        if row is None or id(row) not in self._owned:
+            row = adjacency[node] = set(row or ())
+            self._owned.add(id(row))
+        return row
+
+    def _discard(self, adjacency: dict[int, set[int]], node: int, value: int):
+        """Удаление соседа из дельты; пустые строки не хранятся"""
+        row = self._delta_row(adjacency, node)
+        row.discard(value)
+        if not row:
+            del adjacency[node]
+            self._owned.discard(id(row))
+
+    def _compact_delta(self):
+        if self._changes > max(_DELTA_LIMIT, self._edges // 2):
+            self.freeze()
+
+    def freeze(self):
+        """Вливание дельты в CSR: строки заново сортируются и очищаются от повторов"""
+        if not self._changes:
+            return
+        self._csr = self.from_edges(self.edges())._csr
+        self._added_out, self._added_in = {}, {}
+        self._removed_out, self._removed_in = {}, {}
+        self._owned = set()
+        self._changes = 0
+
+    def _csr_row(self, user_id: int, reverse: bool):
+        """Соседи вершины в CSR: отсортированный срез без копирования"""
+        nodes, out_offsets, out_targets, in_offsets, in_targets = self._csr
+        offsets, targets = (in_offsets, in_targets) if reverse else (out_offsets, out_targets)
+        i = bisect_left(nodes, user_id)
+        if i == len(nodes) or nodes[i] != user_id:
+            return ()
+        return memoryview(targets)[offsets[i]:offsets[i + 1]]
+
+    def _row(self, user_id: int, reverse: bool):
+        """Отсортированные соседи вершины с учетом дельты"""
+        row = self._csr_row(user_id, reverse)
+        added = (self._added_in if reverse else self._added_out).get(user_id)
+        removed = (self._removed_in if reverse else self._removed_out).get(user_id)
+        if added is None and removed is None:
+            return row
+        merged = set(row)
+        if removed is not None:
+            merged -= removed
+        if added is not None:
+            merged |= added
+        return sorted(merged)
+
+    def following(self, user_id: int) -> list[int]:
+        """На кого подписан пользователь"""
+        return list(self._row(user_id, reverse=False))
+
+    def followers(self, user_id: int) -> list[int]:
+        """Кто подписан на пользователя"""
+        return list(self._row(user_id, reverse=True))
+
+    def is_following(self, follower_id: int, followee_id: int) -> bool:
+        added = self._added_out.get(follower_id)
+        if added is not None and followee_id in added:
+            return True
+        removed = self._removed_out.get(follower_id)
+        if removed is not None and followee_id in removed:
+            return False
+        row = self._csr_row(follower_id, reverse=False)
+        i = bisect_left(row, followee_id)
+        return i < len(row) and row[i] == followee_id
+
+    def mutual_followers(self, first_id: int, second_id: int) -> int:
+        """Количество пользователей, подписанных на обоих"""
+        first = self._row(first_id, reverse=True)
+        second = self._row(second_id, reverse=True)
+
+        # Строки отсортированы: пересечение слиянием за O(d1 + d2)
+        count = i = j = 0
+        while i < len(first) and j < len(second):
+            if first[i] == second[j]:
+                count += 1
+                i += 1
+                j += 1
+            elif first[i] < second[j]:
+                i += 1
+            else:
+                j += 1
+        return count
+
+    def friends_of_friends(self, user_id: int, limit: int = 10) -> list[tuple[int, int]]:
+        """Рекомендации: пользователи на расстоянии 2 по подпискам.
+
+        Обход в ширину на два уровня; кандидаты ранжируются по числу общих
+        знакомых. Возвращает пары (user_id, общих знакомых).
+        """
+        direct = self._row(user_id, reverse=False)
+        excluded = set(direct)
+        excluded.add(user_id)
+
+        counts: dict[int, int] = {}
+        for friend_id in direct:
+            for candidate in self._row(friend_id, reverse=False):
+                if candidate not in excluded:
+                    counts[candidate] = counts.get(candidate, 0) + 1
+
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def edges(self):
+        """Все подписки парами (follower_id, followee_id)"""
+        nodes, out_offsets, out_targets, _, _ = self._csr
+        removed = self._removed_out
+        for i, node in enumerate(nodes):
+            skipped = removed.get(node)
+            for j in range(out_offsets[i], out_offsets[i + 1]):
+                if skipped is None or out_targets[j] not in skipped:
+                    yield node, out_targets[j]
+        for follower_id, row in self._added_out.items():
+            for followee_id in row:
+                yield follower_id, followee_id
+
+    def degree_stats(self) -> dict:
+        """Статистика степеней: число вершин и ребер, min/max/mean/median по входящим и исходящим"""
+        nodes, out_offsets, _, in_offsets, _ = self._csr
+        out_degrees = {node: out_offsets[i + 1] - out_offsets[i] for i, node in enumerate(nodes)}
+        in_degrees = {node: in_offsets[i + 1] - in_offsets[i] for i, node in enumerate(nodes)}
+        for adjacency, degrees, sign in ((self._added_out, out_degrees, 1), (self._removed_out, out_degrees, -1),
+                                         (self._added_in, in_degrees, 1), (self._removed_in, in_degrees, -1)):
+            for node, row in adjacency.items():
+                degrees[node] = degrees.get(node, 0) + sign * len(row)
+        nodes = out_degrees.keys() | in_degrees.keys()
+        out_degrees = [out_degrees.get(node, 0) for node in nodes]
+        in_degrees = [in_degrees.get(node, 0) for node in nodes]
+
+        def summary(degrees: list[int]) -> dict:
+            if not degrees:
+                return {'min': 0, 'max': 0, 'mean': 0.0, 'median': 0}
+            return {
+                'min': min(degrees),
+                'max': max(degrees),
+                'mean': sum(degrees) / len(degrees),
+                'median': median(degrees),
+            }
+
+        return {
+            'users': len(nodes),
+            'edges': self._edges,
+            'out': summary(out_degrees),
+            'in': summary(in_degrees),
+        }
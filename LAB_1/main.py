@@ -1,6 +1,33 @@
+import bz2
+import gzip
+import heapq
 import json
+import logging
+import lzma
+import mmap
+import multiprocessing
+import os
+import shutil
+import struct
+import tempfile
+import threading
 import xml.etree.ElementTree as ET
-from datetime import datetime
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import wraps
+from itertools import islice
+from operator import itemgetter
+
+from graph import FollowerGraph
+from metrics import instrumented, metrics
+from search_index import SearchIndex
+from stats import EngagementStats
+
+# Сообщения о сохранении/загрузке; по умолчанию (уровень WARNING) не выводятся
+logger = logging.getLogger("social_network")
 
 # Базовые исключения
 class SocialNetworkError(Exception): pass
@@ -8,6 +35,39 @@ class UserNotFoundError(SocialNetworkError): pass
 class PostNotFoundError(SocialNetworkError): pass
 class ValidationError(SocialNetworkError): pass
 
+class BulkIngestError(SocialNetworkError):
+    """Ошибки пакетной загрузки: содержит полный список найденных проблем"""
+    def __init__(self, errors: list[str]):
+        self.errors = errors
+        preview = "; ".join(errors[:5])
+        more = f" (и еще {len(errors) - 5})" if len(errors) > 5 else ""
+        super().__init__(f"Найдено ошибок: {len(errors)}: {preview}{more}")
+
+
+# Время хранится в компактных форматах как целое число микросекунд от эпохи
+_EPOCH = datetime(1970, 1, 1)
+
+def _to_epoch_us(value: datetime) -> int:
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+def _from_epoch_us(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+def _network_size(network) -> int:
+    """Число записей сети для метрик"""
+    return len(network.users) + len(network.posts) + len(network.comments)
+
+def _saved_objects(args, result) -> int:
+    return _network_size(args[0]) if args else 0
+
+def _loaded_objects(args, result) -> int:
+    return _network_size(result)
+
+def _isoformat(value: datetime | str) -> str:
+    """Дата в ISO; неразобранная строка из доверенного снимка возвращается как есть"""
+    return value if value.__class__ is str else value.isoformat()
+
 
 class User:
     def __init__(self, user_id: int, username: str, email: str):
@@ -27,12 +87,32 @@ class User:
         if not email:
             raise ValidationError("Пользователь не содержит email")
 
+    @property
+    def data_registration(self) -> datetime:
+        # Строка ISO из доверенного снимка разбирается при первом обращении
+        value = self._data_registration
+        if value.__class__ is str:
+            value = self._data_registration = datetime.fromisoformat(value)
+        return value
+
+    @data_registration.setter
+    def data_registration(self, value: datetime):
+        self._data_registration = value
+
     def add_post(self, post: 'Post'):
         self.posts.append(post)
 
     def add_comment(self, comment: 'Comment'):
         self.comments.append(comment)
 
+    # Удаление собирает новый список: снимок сети может обходить старый
+
+    def remove_post(self, post: 'Post'):
+        self.posts = [p for p in self.posts if p is not post]
+
+    def remove_comment(self, comment: 'Comment'):
+        self.comments = [c for c in self.comments if c is not comment]
+
     @classmethod
     def from_dict(cls, data: dict) -> 'User':
         """Десериализация"""
@@ -44,13 +124,25 @@ class User:
         user.data_registration = datetime.fromisoformat(data['data_registration'])
         return user  # posts и comments восстановятся позже!
 
+    @classmethod
+    def from_trusted_dict(cls, data: dict) -> 'User':
+        """Десериализация собственного снимка: без валидации и разбора даты"""
+        user = cls.__new__(cls)
+        user.user_id = data['user_id']
+        user.username = data['username']
+        user.email = data['email']
+        user._data_registration = data['data_registration']
+        user.posts = []
+        user.comments = []
+        return user
+
     def to_dict(self) -> dict:
         """Преобразование в словарь для сериализации"""
         return {
             'user_id': self.user_id,
             'username': self.username,
             'email': self.email,
-            'data_registration': self.data_registration.isoformat(),
+            'data_registration': _isoformat(self._data_registration),
             'posts': [p.post_id for p in self.posts],
             'comments': [c.comment_id for c in self.comments]
         }
@@ -74,9 +166,23 @@ class Post:
         if not text:
             raise ValidationError("Пост не содержит текст")
 
+    @property
+    def created_at(self) -> datetime:
+        value = self._created_at
+        if value.__class__ is str:
+            value = self._created_at = datetime.fromisoformat(value)
+        return value
+
+    @created_at.setter
+    def created_at(self, value: datetime):
+        self._created_at = value
+
     def add_comment(self, comment: 'Comment'):
         self.comments.append(comment)
 
+    def remove_comment(self, comment: 'Comment'):
+        self.comments = [c for c in self.comments if c is not comment]
+
     @classmethod
     def from_dict(cls, data: dict) -> 'Post':
         """Десериализация"""
@@ -88,13 +194,24 @@ class Post:
         post.created_at = datetime.fromisoformat(data['created_at'])
         return post  # comments восстановятся позже!
 
+    @classmethod
+    def from_trusted_dict(cls, data: dict) -> 'Post':
+        """Десериализация собственного снимка: без валидации и разбора даты"""
+        post = cls.__new__(cls)
+        post.post_id = data['post_id']
+        post.user_id = data['user_id']
+        post.text = data['text']
+        post._created_at = data['created_at']
+        post.comments = []
+        return post
+
     def to_dict(self) -> dict:
         """Преобразование в словарь для сериализации"""
         return {
             'post_id': self.post_id,
             'user_id': self.user_id,
             'text': self.text,
-            'created_at': self.created_at.isoformat(),
+            'created_at': _isoformat(self._created_at),
             'comments': [c.comment_id for c in self.comments]
         }
 
@@ -117,6 +234,17 @@ class Comment:
         if not text:
             raise ValidationError("Комментарии не содержат текст")
 
+    @property
+    def created_at(self) -> datetime:
+        value = self._created_at
+        if value.__class__ is str:
+            value = self._created_at = datetime.fromisoformat(value)
+        return value
+
+    @created_at.setter
+    def created_at(self, value: datetime):
+        self._created_at = value
+
     @classmethod
     def from_dict(cls, data: dict) -> 'Comment':
         """Десериализация"""
@@ -129,6 +257,17 @@ class Comment:
         comment.created_at = datetime.fromisoformat(data['created_at'])
         return comment
 
+    @classmethod
+    def from_trusted_dict(cls, data: dict) -> 'Comment':
+        """Десериализация собственного снимка: без валидации и разбора даты"""
+        comment = cls.__new__(cls)
+        comment.comment_id = data['comment_id']
+        comment.user_id = data['user_id']
+        comment.post_id = data['post_id']
+        comment.text = data['text']
+        comment._created_at = data['created_at']
+        return comment
+
     def to_dict(self) -> dict:
         """Преобразование в словарь для сериализации"""
         return {
@@ -136,248 +275,1766 @@ class Comment:
             'user_id': self.user_id,
             'post_id': self.post_id,
             'text': self.text,
-            'created_at': self.created_at.isoformat()
+            'created_at': _isoformat(self._created_at)
         }
 
     def __str__(self):
         return f"Comment({self.comment_id}): {self.text[:30]}..."
 
+class IntegrityReport:
+    """Отчет о ссылочной целостности, собранный при загрузке сети"""
+    def __init__(self):
+        self.orphan_posts: list[int] = []      # посты, автор которых не найден
+        self.orphan_comments: list[int] = []   # комментарии без поста или автора
+        self.mismatches: list[str] = []        # расхождения сохраненных списков id
+
+    @property
+    def ok(self) -> bool:
+        return not (self.orphan_posts or self.orphan_comments or self.mismatches)
+
+    def __str__(self):
+        if self.ok:
+            return "Ссылочная целостность не нарушена"
+        return (f"Посты без автора: {len(self.orphan_posts)}, "
+                f"комментарии без поста или автора: {len(self.orphan_comments)}, "
+                f"расхождения списков: {len(self.mismatches)}")
+
+
+class _Top:
+    """Значение больше любого другого: верхняя граница для составных ключей"""
+    def __eq__(self, other): return other is self
+    def __lt__(self, other): return False
+    def __le__(self, other): return other is self
+    def __gt__(self, other): return other is not self
+    def __ge__(self, other): return True
+    __hash__ = object.__hash__
+
+_TOP = _Top()
+
+
+# Сколько новых ключей вставлять по одному через insort; больший буфер вливается слиянием
+_INSORT_LIMIT = 32
+
+
+class _SortedIndex:
+    """Отсортированный индекс: владелец -> список ключей (created_at, id).
+
+    У каждого владельца (пользователя, поста) свой список, поэтому вставка
+    и запрос затрагивают только его записи. owner=None - один общий список.
+    Новые ключи копятся в буфере владельца и вливаются в список при первом
+    запросе: небольшой буфер вставляется через insort, большой (массовая
+    загрузка) - одним слиянием.
+    """
+    __slots__ = ('_key', '_owner', '_lists', '_pending', '_flush_lock')
+
+    def __init__(self, key, owner=None):
+        self._key = key
+        self._owner = owner
+        self._lists: dict[object, list[tuple]] = {}
+        self._pending: dict[object, list] = {}
+        # Несколько читателей могут одновременно вливать буфер
+        self._flush_lock = threading.Lock()
+
+    def add(self, item):
+        owner = self._owner(item) if self._owner is not None else None
+        pending = self._pending.get(owner)
+        if pending is None:
+            self._pending[owner] = [item]
+        else:
+            pending.append(item)
+
+    def remove(self, item):
+        """Удаление ключа записи (при замене записи с тем же id)"""
+        owner = self._owner(item) if self._owner is not None else None
+        keys = self._flush(owner)
+        key = self._key(item)
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+
+    def _flush(self, owner) -> list[tuple]:
+        if owner in self._pending:
+            with self._flush_lock:
+                pending = self._pending.pop(owner, None)
+                if pending:
+                    new_keys = sorted(map(self._key, pending))
+                    keys = self._lists.get(owner)
+                    if keys is None:
+                        self._lists[owner] = new_keys
+                    elif not keys or keys[-1] <= new_keys[0]:
+                        keys.extend(new_keys)
+                    elif len(new_keys) <= _INSORT_LIMIT:
+                        for key in new_keys:
+                            insort(keys, key)
+                    else:
+                        self._lists[owner] = list(heapq.merge(keys, new_keys))
+        return self._lists.get(owner, [])
+
+    def range(self, owner=None, start=None, end=None) -> list[int]:
+        """id записей владельца со временем в [start, end] за O(log n + k)"""
+        keys = self._flush(owner)
+        low = bisect_left(keys, (start,)) if start is not None else 0
+        high = bisect_right(keys, (end, _TOP)) if end is not None else len(keys)
+        return [key[-1] for key in keys[low:high]]
+
+    def keys(self, owner=None) -> list[tuple]:
+        """Отсортированный список ключей владельца (не изменять)"""
+        return self._flush(owner)
+
+
+def _descending(keys: list, high: int):
+    """Элементы keys[:high] от последнего к первому без копирования списка"""
+    for i in range(high - 1, -1, -1):
+        yield keys[i]
+
+
 class SocialNetwork:
+    # Классы сущностей; подклассы могут подменить их компактными реализациями
+    user_class = User
+    post_class = Post
+    comment_class = Comment
+
     def __init__(self):
         self.users: dict[int, User] = {}
         self.posts: dict[int, Post] = {}
         self.comments: dict[int, Comment] = {}
 
+        # Вторичные индексы
+        self._users_by_username: dict[str, User] = {}
+        self._users_by_email: dict[str, User] = {}
+        self._posts_by_time = _SortedIndex(lambda p: (p.created_at, p.post_id))
+        self._posts_by_user = _SortedIndex(lambda p: (p.created_at, p.post_id), lambda p: p.user_id)
+        self._comments_by_post = _SortedIndex(lambda c: (c.created_at, c.comment_id), lambda c: c.post_id)
+
+        # Журнал изменений (ChangeLog), если включена инкрементальная запись
+        self.change_log = None
+        # Висячие ссылки и расхождения, найденные при загрузке
+        self.integrity_report = IntegrityReport()
+        # Полнотекстовый индекс (включается через enable_search)
+        self.search_index: SearchIndex | None = None
+        # Счетчики активности (включаются через enable_stats)
+        self.stats: EngagementStats | None = None
+        # Подписки между пользователями
+        self.graph = FollowerGraph()
+
+    @instrumented("add_user")
     def add_user(self, user_id: int, username: str, email: str) -> User:
-        user = User(user_id, username, email)
-        self.users[user_id] = user
+        user = self.user_class(user_id, username, email)
+        self._register_user(user)
+        if self.change_log is not None:
+            self.change_log.append_user(user)
         return user
 
+    @instrumented("add_post")
     def add_post(self, post_id: int, user_id: int, text: str) -> Post:
-        user = self.users[user_id]
-        post = Post(post_id, user_id, text)
-        self.posts[post_id] = post
-        user.add_post(post)
+        if user_id not in self.users:
+            raise KeyError(user_id)
+        post = self.post_class(post_id, user_id, text)
+        self._register_post(post)
+        if self.change_log is not None:
+            self.change_log.append_post(post)
         return post
 
+    @instrumented("add_comment")
     def add_comment(self, comment_id: int, user_id: int, post_id: int, text: str) -> Comment:
-        user = self.users[user_id]
-        post = self.posts[post_id]
-        comment = Comment(comment_id, user_id, post_id, text)
-        self.comments[comment_id] = comment
-        post.add_comment(comment)
-        user.add_comment(comment)
+        if user_id not in self.users:
+            raise KeyError(user_id)
+        if post_id not in self.posts:
+            raise KeyError(post_id)
+        comment = self.comment_class(comment_id, user_id, post_id, text)
+        self._register_comment(comment)
+        if self.change_log is not None:
+            self.change_log.append_comment(comment)
         return comment
 
+    @staticmethod
+    def _batch_rows(batch, fields: tuple):
+        """Строки пакета: кортежи, словари или колонки {поле: список}"""
+        if isinstance(batch, dict):
+            return zip(*(batch[field] for field in fields))
+        return (
+            tuple(row[field] for field in fields) if isinstance(row, dict) else row
+            for row in batch
+        )
+
+    @instrumented("bulk_add", lambda args, result: sum(result))
+    def bulk_add(self, users=(), posts=(), comments=()) -> tuple[int, int, int]:
+        """Пакетная загрузка пользователей, постов и комментариев.
+
+        Каждый пакет - итерируемое кортежей в порядке аргументов add_*,
+        словарей с теми же ключами или колоночный словарь списков.
+        Все строки проверяются за один проход; при любых ошибках сеть не
+        меняется и выбрасывается BulkIngestError со всеми ошибками сразу.
+        """
+        errors = []
+        new_users, new_posts, new_comments = [], [], []
+        user_ids, post_ids, comment_ids = set(), set(), set()
+        usernames, emails = set(), set()
+
+        for row in self._batch_rows(users, ('user_id', 'username', 'email')):
+            try:
+                user = self.user_class(*row)
+            except (ValidationError, TypeError) as e:
+                errors.append(f"Пользователь {row[0] if row else '?'}: {e}")
+                continue
+            if user.user_id in user_ids:
+                errors.append(f"Пользователь {user.user_id}: повторный id в пакете")
+            email = user.email.lower()
+            taken = self._username_owner(user.username)
+            if user.username in usernames or (taken is not None and taken != user.user_id):
+                errors.append(f"Пользователь {user.user_id}: имя {user.username} уже занято")
+            taken = self._email_owner(email)
+            if email in emails or (taken is not None and taken != user.user_id):
+                errors.append(f"Пользователь {user.user_id}: email {user.email} уже занят")
+            user_ids.add(user.user_id)
+            usernames.add(user.username)
+            emails.add(email)
+            new_users.append(user)
+
+        for row in self._batch_rows(posts, ('post_id', 'user_id', 'text')):
+            try:
+                post = self.post_class(*row)
+            except (ValidationError, TypeError) as e:
+                errors.append(f"Пост {row[0] if row else '?'}: {e}")
+                continue
+            if post.post_id in post_ids:
+                errors.append(f"Пост {post.post_id}: повторный id в пакете")
+            if post.user_id not in user_ids and post.user_id not in self.users:
+                errors.append(f"Пост {post.post_id}: пользователь {post.user_id} не найден")
+            post_ids.add(post.post_id)
+            new_posts.append(post)
+
+        for row in self._batch_rows(comments, ('comment_id', 'user_id', 'post_id', 'text')):
+            try:
+                comment = self.comment_class(*row)
+            except (ValidationError, TypeError) as e:
+                errors.append(f"Комментарий {row[0] if row else '?'}: {e}")
+                continue
+            if comment.comment_id in comment_ids:
+                errors.append(f"Комментарий {comment.comment_id}: повторный id в пакете")
+            if comment.user_id not in user_ids and comment.user_id not in self.users:
+                errors.append(f"Комментарий {comment.comment_id}: пользователь {comment.user_id} не найден")
+            if comment.post_id not in post_ids and comment.post_id not in self.posts:
+                errors.append(f"Комментарий {comment.comment_id}: пост {comment.post_id} не найден")
+            comment_ids.add(comment.comment_id)
+            new_comments.append(comment)
+
+        if errors:
+            raise BulkIngestError(errors)
+
+        # Все ссылки проверены - связываем объекты одним проходом
+        for user in new_users:
+            self._register_user(user)
+        for post in new_posts:
+            self._register_post(post)
+        for comment in new_comments:
+            self._register_comment(comment)
+
+        if self.change_log is not None:
+            for user in new_users:
+                self.change_log.append_user(user)
+            for post in new_posts:
+                self.change_log.append_post(post)
+            for comment in new_comments:
+                self.change_log.append_comment(comment)
+
+        return len(new_users), len(new_posts), len(new_comments)
+
+    def _username_owner(self, username: str) -> int | None:
+        """id пользователя с таким именем (для проверок уникальности)"""
+        user = self._users_by_username.get(username)
+        return user.user_id if user is not None else None
+
+    def _email_owner(self, email: str) -> int | None:
+        """id пользователя с таким email в нижнем регистре"""
+        user = self._users_by_email.get(email)
+        return user.user_id if user is not None else None
+
+    def _store_user(self, user: User):
+        """Сохранение пользователя в таблице и индексах (без связей)"""
+        email = user.email.lower()
+        for index, key in ((self._users_by_username, user.username), (self._users_by_email, email)):
+            other = index.get(key)
+            if other is not None and other.user_id != user.user_id:
+                raise ValidationError(f"Значение {key} уже занято пользователем {other.user_id}")
+
+        old = self.users.get(user.user_id)
+        if old is not None:
+            self._users_by_username.pop(old.username, None)
+            self._users_by_email.pop(old.email.lower(), None)
+
+        self.users[user.user_id] = user
+        self._users_by_username[user.username] = user
+        self._users_by_email[email] = user
+
+    def _store_post(self, post: Post):
+        """Сохранение поста в таблице и индексах (без связей); старый пост с тем же id заменяется"""
+        old = self.posts.get(post.post_id)
+        if old is not None:
+            self._posts_by_time.remove(old)
+            self._posts_by_user.remove(old)
+        if self.search_index is not None:
+            if old is not None:
+                self.search_index.remove('post', old.post_id, old.text)
+            self.search_index.add('post', post.post_id, post.text)
+        if self.stats is not None:
+            if old is not None:
+                self.stats.add_post(old, -1)
+            self.stats.add_post(post)
+
+        self.posts[post.post_id] = post
+        self._posts_by_time.add(post)
+        self._posts_by_user.add(post)
+
+    def _store_comment(self, comment: Comment):
+        """Сохранение комментария в таблице и индексах (без связей); старый комментарий заменяется"""
+        old = self.comments.get(comment.comment_id)
+        if old is not None:
+            self._comments_by_post.remove(old)
+        if self.search_index is not None:
+            if old is not None:
+                self.search_index.remove('comment', old.comment_id, old.text)
+            self.search_index.add('comment', comment.comment_id, comment.text)
+        if self.stats is not None:
+            if old is not None:
+                self.stats.add_comment(old, -1)
+            self.stats.add_comment(comment)
+
+        self.comments[comment.comment_id] = comment
+        self._comments_by_post.add(comment)
+
+    def _register_user(self, user: User):
+        """Регистрация готового пользователя (используется загрузчиками)"""
+        old = self.users.get(user.user_id)
+        self._store_user(user)
+        if old is not None and old is not user:
+            # Замена: посты и комментарии переходят к новой версии пользователя
+            for post in old.posts:
+                user.add_post(post)
+            for comment in old.comments:
+                user.add_comment(comment)
+
+    def _register_post(self, post: Post):
+        """Регистрация готового поста и привязка к автору по user_id"""
+        old = self.posts.get(post.post_id)
+        self._store_post(post)
+        self._link_post(post)
+        if old is not None and old is not post:
+            # Замена: старый пост отвязывается от автора, комментарии переходят к новому
+            author = self.users.get(old.user_id)
+            if author is not None:
+                author.remove_post(old)
+            for comment in old.comments:
+                post.add_comment(comment)
+
+    def _register_comment(self, comment: Comment):
+        """Регистрация готового комментария и привязка к посту и автору"""
+        old = self.comments.get(comment.comment_id)
+        self._store_comment(comment)
+        self._link_comment(comment)
+        if old is not None and old is not comment:
+            post = self.posts.get(old.post_id)
+            if post is not None:
+                post.remove_comment(old)
+            author = self.users.get(old.user_id)
+            if author is not None:
+                author.remove_comment(old)
+
+    def _link_post(self, post: Post):
+        """Привязка поста к автору; пост без автора попадает в отчет"""
+        user = self.users.get(post.user_id)
+        if user is not None:
+            user.add_post(post)
+        else:
+            self.integrity_report.orphan_posts.append(post.post_id)
+
+    def _link_comment(self, comment: Comment):
+        """Привязка комментария к посту и автору; висячие ссылки попадают в отчет"""
+        post = self.posts.get(comment.post_id)
+        user = self.users.get(comment.user_id)
+        if post is not None:
+            post.add_comment(comment)
+        if user is not None:
+            user.add_comment(comment)
+        if post is None or user is None:
+            self.integrity_report.orphan_comments.append(comment.comment_id)
+
+    def snapshot(self) -> 'SocialNetwork':
+        """Согласованное представление для сериализации.
+
+        Обычная сеть не используется из нескольких потоков, поэтому это она
+        сама; ConcurrentSocialNetwork возвращает снимок копирования при записи.
+        """
+        return self
+
+    def _visible_posts(self, posts: list[Post]) -> list[Post]:
+        """Посты из связей объекта, входящие в эту сеть (снимок их фильтрует)"""
+        return posts
+
+    def _visible_comments(self, comments: list[Comment]) -> list[Comment]:
+        return comments
+
+    def follow(self, follower_id: int, followee_id: int) -> bool:
+        """Подписка follower_id на followee_id; False, если она уже была"""
+        self._check_follow(follower_id, followee_id)
+        added = self.graph.follow(follower_id, followee_id)
+        if added and self.change_log is not None:
+            self.change_log.append_follow(follower_id, followee_id)
+        return added
+
+    def unfollow(self, follower_id: int, followee_id: int) -> bool:
+        """Отписка; False, если подписки не было"""
+        self._check_follow(follower_id, followee_id)
+        removed = self.graph.unfollow(follower_id, followee_id)
+        if removed and self.change_log is not None:
+            self.change_log.append_unfollow(follower_id, followee_id)
+        return removed
+
+    def _check_follow(self, follower_id: int, followee_id: int):
+        for user_id in (follower_id, followee_id):
+            if user_id not in self.users:
+                raise UserNotFoundError(f"Пользователь {user_id} не найден")
+        if follower_id == followee_id:
+            raise ValidationError("Нельзя подписаться на самого себя")
+
+    def recommend_users(self, user_id: int, limit: int = 10) -> list[tuple[User, int]]:
+        """Рекомендации "друзья друзей": пары (пользователь, общих знакомых)"""
+        return [(self.users[candidate], common)
+                for candidate, common in self.graph.friends_of_friends(user_id, limit)
+                if candidate in self.users]
+
+    def enable_search(self, index: SearchIndex = None) -> SearchIndex:
+        """Включение полнотекстового поиска.
+
+        Без аргумента индекс строится по текущим постам и комментариям;
+        можно передать индекс, загруженный через SearchIndex.load.
+        Дальше add_post/add_comment обновляют его сами.
+        """
+        if index is None:
+            index = SearchIndex()
+            for post in self.posts.values():
+                index.add('post', post.post_id, post.text)
+            for comment in self.comments.values():
+                index.add('comment', comment.comment_id, comment.text)
+        self.search_index = index
+        return index
+
+    def enable_stats(self) -> EngagementStats:
+        """Включение счетчиков активности.
+
+        Счетчики строятся по текущим постам и комментариям одним проходом,
+        дальше add_post/add_comment обновляют их за O(log n).
+        """
+        stats = EngagementStats()
+        for post in self.posts.values():
+            stats.add_post(post)
+        for comment in self.comments.values():
+            stats.add_comment(comment)
+        self.stats = stats
+        return stats
+
+    def search(self, query: str, k: int = 10, kind: str = None) -> list[tuple[float, Post | Comment]]:
+        """Поиск по текстам постов и комментариев: top-k пар (оценка, объект).
+
+        Фразы задаются в двойных кавычках; kind ограничивает тип ('post'/'comment').
+        """
+        if self.search_index is None:
+            raise SocialNetworkError("Поиск не включен: вызовите enable_search()")
+        tables = {'post': self.posts, 'comment': self.comments}
+        return [(score, tables[doc_kind][doc_id])
+                for score, doc_kind, doc_id in self.search_index.search(query, k, kind)]
+
+    def find_user_by_username(self, username: str) -> User | None:
+        """Поиск пользователя по имени за O(1)"""
+        return self._users_by_username.get(username)
+
+    def find_user_by_email(self, email: str) -> User | None:
+        """Поиск пользователя по email (без учета регистра) за O(1)"""
+        return self._users_by_email.get(email.lower())
+
+    def posts_between(self, start: datetime = None, end: datetime = None, user_id: int = None) -> list[Post]:
+        """Посты с created_at в [start, end] (границы включительно), по возрастанию времени.
+
+        Если указан user_id, возвращаются только посты этого пользователя.
+        """
+        if user_id is None:
+            post_ids = self._posts_by_time.range(None, start, end)
+        else:
+            post_ids = self._posts_by_user.range(user_id, start, end)
+        return [self.posts[post_id] for post_id in post_ids]
+
+    def comments_between(self, post_id: int, start: datetime = None, end: datetime = None) -> list[Comment]:
+        """Комментарии к посту с created_at в [start, end], по возрастанию времени"""
+        comment_ids = self._comments_by_post.range(post_id, start, end)
+        return [self.comments[comment_id] for comment_id in comment_ids]
+
+    def feed(self, user_ids, limit: int = 20, cursor: str = None) -> tuple[list[Post], str | None]:
+        """Лента: limit самых новых постов указанных пользователей.
+
+        Списки постов каждого пользователя уже отсортированы по времени в
+        индексе. Страницу могут дать только пользователи, чей самый новый
+        пост (до курсора) входит в limit + 1 лучших: они выбираются за
+        O(k log limit), а их списки сливаются через кучу за
+        O(limit log limit). Возвращает посты и курсор следующей страницы
+        (None, если постов больше нет).
+        """
+        before = None
+        if cursor is not None:
+            created_at, post_id = cursor.rsplit('|', 1)
+            before = (datetime.fromisoformat(created_at), int(post_id))
+
+        index = self._posts_by_user
+        heads = []
+        for user_id in set(user_ids):
+            keys = index.keys(user_id)
+            high = bisect_left(keys, before) if before is not None else len(keys)
+            if high:
+                heads.append((keys[high - 1], high, keys))
+        heads = heapq.nlargest(limit + 1, heads, key=itemgetter(0))
+        merged = heapq.merge(*(_descending(keys, high) for _, high, keys in heads), reverse=True)
+        page = list(islice(merged, limit + 1))
+
+        next_cursor = None
+        if len(page) > limit:
+            page.pop()
+            created_at, post_id = page[-1]
+            next_cursor = f"{created_at.isoformat()}|{post_id}"
+        return [self.posts[post_id] for _, post_id in page], next_cursor
+
     @classmethod
-    def from_dict(cls, data: dict) -> 'SocialNetwork':
-        """Создание социальной сети из словаря"""
+    @instrumented("from_dict", _loaded_objects)
+    def from_dict(cls, data: dict, trusted: bool = False) -> 'SocialNetwork':
+        """Создание социальной сети из словаря.
+
+        Связи восстанавливаются одним проходом по внешним ключам Post.user_id
+        и Comment.post_id/user_id, поэтому списки posts/comments внутри
+        записей необязательны. Если они есть, они только сверяются;
+        висячие ссылки и расхождения попадают в sn.integrity_report.
+        trusted=True - данные записаны самим сериализатором: объекты создаются
+        через from_trusted_dict без валидации, даты разбираются при обращении,
+        списки id не сверяются.
+        """
         sn = cls()
+        users_data = data.get('users', {})
+        posts_data = data.get('posts', {})
+        user_from_dict, post_from_dict, comment_from_dict = cls._record_factories(trusted)
 
-        # 1. Создаем все объекты
-        for user_data in data.get('users', {}).values():
-            user = User.from_dict(user_data)
-            sn.users[user.user_id] = user
+        # 1. Создаем все объекты (ключи словарей не используются - id берется из записи)
+        for user_data in users_data.values():
+            sn._store_user(user_from_dict(user_data))
 
-        for post_data in data.get('posts', {}).values():
-            post = Post.from_dict(post_data)
-            sn.posts[post.post_id] = post
+        for post_data in posts_data.values():
+            sn._store_post(post_from_dict(post_data))
 
         for comment_data in data.get('comments', {}).values():
-            comment = Comment.from_dict(comment_data)
-            sn.comments[comment.comment_id] = comment
+            sn._store_comment(comment_from_dict(comment_data))
+
+        # 2. Связываем по внешним ключам
+        with metrics.timer("from_dict.link", len(sn.posts) + len(sn.comments)):
+            for post in sn.posts.values():
+                sn._link_post(post)
+            for comment in sn.comments.values():
+                sn._link_comment(comment)
+
+        # 3. Сверяем сохраненные списки id, если они есть (свой снимок не сверяем)
+        if not trusted:
+            sn._check_id_lists(users_data, posts_data)
 
-        # 2. Восстанавливаем связи
-        sn._restore_relationships(data)
+        # 4. Подписки (их может не быть в старых файлах) - сразу в CSR
+        sn.graph.add_edges(data.get('follows', ()))
 
         return sn
 
-    def _restore_relationships(self, data: dict):
-        """Восстановление всех связей между объектами"""
-        # Восстанавливаем комментарии к постам
-        for post_id, post_data in data.get('posts', {}).items():
-            post = self.posts[int(post_id)]
-            for comment_id in post_data.get('comments', []):
-                if comment_id in self.comments:
-                    post.add_comment(self.comments[comment_id])
-
-        # Восстанавливаем посты пользователей
-        for user_id, user_data in data.get('users', {}).items():
-            user = self.users[int(user_id)]
-            for post_id in user_data.get('posts', []):
-                if post_id in self.posts:
-                    user.add_post(self.posts[post_id])
-            for comment_id in user_data.get('comments', []):
-                if comment_id in self.comments:
-                    user.add_comment(self.comments[comment_id])
+    @classmethod
+    def _record_factories(cls, trusted: bool) -> tuple:
+        """Функции создания пользователя, поста и комментария из записи"""
+        if trusted:
+            return (cls.user_class.from_trusted_dict, cls.post_class.from_trusted_dict,
+                    cls.comment_class.from_trusted_dict)
+        return cls.user_class.from_dict, cls.post_class.from_dict, cls.comment_class.from_dict
+
+    def _check_id_lists(self, users_data: dict, posts_data: dict):
+        """Сверка списков id из файла со связями, построенными по внешним ключам"""
+        mismatches = self.integrity_report.mismatches
+
+        def compare(owner: str, field: str, stored, actual):
+            if stored is None:
+                return
+            stored, actual = set(stored), set(actual)
+            if stored != actual:
+                mismatches.append(
+                    f"{owner}: в списке {field} лишние {sorted(stored - actual)}, "
+                    f"отсутствуют {sorted(actual - stored)}"
+                )
+
+        for user_data in users_data.values():
+            user = self.users[user_data['user_id']]
+            owner = f"Пользователь {user.user_id}"
+            compare(owner, 'posts', user_data.get('posts'), (p.post_id for p in user.posts))
+            compare(owner, 'comments', user_data.get('comments'), (c.comment_id for c in user.comments))
+
+        for post_data in posts_data.values():
+            post = self.posts[post_data['post_id']]
+            compare(f"Пост {post.post_id}", 'comments', post_data.get('comments'),
+                    (c.comment_id for c in post.comments))
 
     def to_dict(self) ->dict:
         """Преобразование в словарь для сериализации"""
-        return {
+        data = {
             'users': {user_id: user.to_dict() for user_id, user in self.users.items()},
             'posts': {post_id: post.to_dict() for post_id, post in self.posts.items()},
             'comments': {comment_id: comment.to_dict() for comment_id, comment in self.comments.items()}
         }
+        # Раздел подписок пишется только при наличии подписок, чтобы не менять старый формат
+        if len(self.graph):
+            data['follows'] = [list(edge) for edge in self.graph.edges()]
+        return data
+
+
+class RWLock:
+    """Блокировка читатели/писатель с приоритетом писателя (не реентерабельная)"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+_MISSING = object()
+
+
+class _LayeredTable(MutableMapping):
+    """Таблица для копирования при записи: стопка словарей-слоев.
+
+    Запись идет в верхний слой, чтение - сверху вниз. seal() закрывает
+    верхний слой (его уже видит снимок) и начинает новый, поэтому первая
+    запись после снимка не копирует таблицу целиком. Закрытый слой
+    сливается с нижним, когда догоняет его по размеру: каждая запись
+    копируется O(log n) раз, а слоев остается O(log n).
+    """
+    __slots__ = ('_layers', '_size')
+
+    def __init__(self, layers: list[dict] = None, size: int = 0):
+        self._layers = layers if layers is not None else [{}]
+        self._size = size
+
+    def view(self) -> '_LayeredTable':
+        """Таблица на текущих слоях; писатель до следующей записи вызовет seal()"""
+        return _LayeredTable(self._layers, self._size)
+
+    def seal(self):
+        # Слои могут читать снимки: список и слои не меняются, а заменяются новыми
+        layers = self._layers[:]
+        if not layers[-1]:
+            layers.pop()
+        while len(layers) > 1 and 2 * len(layers[-1]) >= len(layers[-2]):
+            top = layers.pop()
+            merged = dict(layers[-1])
+            merged.update(top)
+            layers[-1] = merged
+        layers.append({})
+        self._layers = layers
+
+    def __getitem__(self, key):
+        for layer in reversed(self._layers):
+            value = layer.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        for layer in reversed(self._layers):
+            value = layer.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+        return default
+
+    def __contains__(self, key):
+        return any(key in layer for layer in self._layers)
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._size += 1
+        self._layers[-1][key] = value
+
+    def __delitem__(self, key):
+        raise SocialNetworkError("Удаление записей не поддерживается")
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        # Ключ выдается на месте первой вставки, как в dict
+        layers = self._layers
+        for number, layer in enumerate(layers):
+            lower = layers[:number]
+            for key in layer:
+                if not any(key in other for other in lower):
+                    yield key
+
+    def values(self):
+        for key in self:
+            yield self[key]
+
+    def items(self):
+        for key in self:
+            yield key, self[key]
+
+
+def _reading(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.read():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _writing(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.write():
+            self._copy_on_write()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class NetworkSnapshot(SocialNetwork):
+    """Неизменяемый снимок таблиц сети на момент вызова snapshot().
+
+    Предназначен для сериализации: связи объектов могли пополниться после
+    снимка, поэтому в выгрузку попадают только объекты из таблиц снимка.
+    """
+
+    def __init__(self, users: dict, posts: dict, comments: dict, graph: FollowerGraph):
+        super().__init__()
+        self.users = users
+        self.posts = posts
+        self.comments = comments
+        self.graph = graph
+
+    def _visible_posts(self, posts: list[Post]) -> list[Post]:
+        table = self.posts
+        return [post for post in posts if table.get(post.post_id) is post]
+
+    def _visible_comments(self, comments: list[Comment]) -> list[Comment]:
+        table = self.comments
+        return [comment for comment in comments if table.get(comment.comment_id) is comment]
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        for records in (data['users'], data['posts']):
+            for record in records.values():
+                if 'posts' in record:
+                    record['posts'] = [i for i in record['posts'] if i in self.posts]
+                record['comments'] = [i for i in record['comments'] if i in self.comments]
+        return data
+
+    def _read_only(self, *args, **kwargs):
+        raise SocialNetworkError("Снимок сети доступен только для чтения")
+
+    add_user = add_post = add_comment = bulk_add = follow = unfollow = _read_only
+
+
+class ConcurrentSocialNetwork(SocialNetwork):
+    """Социальная сеть для общего доступа из нескольких потоков.
+
+    Изменения выполняются под блокировкой писателя, запросы - под
+    блокировкой читателя. Таблицы состоят из слоев (_LayeredTable):
+    snapshot() отдает текущие слои без копирования, а первая запись после
+    снимка только начинает новый верхний слой; граф копирует лишь дельту
+    над общим CSR. Поэтому сериализация снимка не останавливает писателей,
+    а запись после снимка не копирует сеть целиком.
+    Загружать данные (from_dict, загрузчики сериализатора) нужно до
+    того, как сеть станет доступна другим потокам.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.users = _LayeredTable()
+        self.posts = _LayeredTable()
+        self.comments = _LayeredTable()
+        self._lock = RWLock()
+        self._shared = False
+
+    def _copy_on_write(self):
+        if self._shared:
+            self.users.seal()
+            self.posts.seal()
+            self.comments.seal()
+            self.graph = self.graph.copy()
+            self._shared = False
+
+    @_reading
+    def snapshot(self) -> NetworkSnapshot:
+        self._shared = True
+        return NetworkSnapshot(self.users.view(), self.posts.view(), self.comments.view(), self.graph)
+
+    add_user = _writing(SocialNetwork.add_user)
+    add_post = _writing(SocialNetwork.add_post)
+    add_comment = _writing(SocialNetwork.add_comment)
+    bulk_add = _writing(SocialNetwork.bulk_add)
+    follow = _writing(SocialNetwork.follow)
+    unfollow = _writing(SocialNetwork.unfollow)
+    enable_search = _writing(SocialNetwork.enable_search)
+    enable_stats = _writing(SocialNetwork.enable_stats)
+
+    find_user_by_username = _reading(SocialNetwork.find_user_by_username)
+    find_user_by_email = _reading(SocialNetwork.find_user_by_email)
+    posts_between = _reading(SocialNetwork.posts_between)
+    comments_between = _reading(SocialNetwork.comments_between)
+    feed = _reading(SocialNetwork.feed)
+    search = _reading(SocialNetwork.search)
+    recommend_users = _reading(SocialNetwork.recommend_users)
+    to_dict = _reading(SocialNetwork.to_dict)
+
 
 # Сериализация и десериализация
+JSONL_FORMAT = "social_network"
+JSONL_VERSION = 1
+# Версия доверенной разметки: снимок записан этим сериализатором, записи
+# прошли валидацию, даты в isoformat. Только такие файлы грузятся с trusted=True
+TRUSTED_VERSION = 1
+_META = {'format': JSONL_FORMAT, 'version': JSONL_VERSION, 'trusted': TRUSTED_VERSION}
+
+# Общие кодировщик/декодировщик без форматирования для JSON Lines
+_JSONL_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+_JSONL_DECODER = json.JSONDecoder()
+
+# Сжатие снимков JSON/JSON Lines/XML: имя кодека -> модуль с функцией open
+COMPRESSIONS = {'gzip': gzip, 'bz2': bz2, 'lzma': lzma}
+_COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'lzma', '.lzma': 'lzma'}
+
+
+def open_snapshot(filename: str, mode: str = 'r', compression: str = None, **kwargs):
+    """Открытие файла снимка с потоковым сжатием.
+
+    compression - 'gzip', 'bz2', 'lzma' или 'none'; по умолчанию кодек
+    выбирается по расширению (.gz, .bz2, .xz/.lzma), иначе файл не сжат.
+    Остальные аргументы передаются в open (encoding, errors, ...).
+    """
+    if compression is None:
+        compression = _COMPRESSION_EXTENSIONS.get(os.path.splitext(filename)[1].lower(), 'none')
+    if compression == 'none':
+        return open(filename, mode, **kwargs)
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Неизвестный кодек сжатия: {compression}")
+    if 'b' not in mode and 't' not in mode:
+        mode += 't'
+    return COMPRESSIONS[compression].open(filename, mode, **kwargs)
+
+
+def _check_meta(meta: dict, source: str, trusted: bool) -> bool:
+    """Проверка заголовка формата; True, если файл можно грузить в доверенном режиме"""
+    if meta.get('format') != JSONL_FORMAT or meta.get('version', 0) > JSONL_VERSION:
+        raise SocialNetworkError(f"Неподдерживаемый формат {source}: {meta}")
+    return trusted and meta.get('trusted') == TRUSTED_VERSION
+
+
 class SocialNetworkSerializer:
     @staticmethod
-    def save_to_json(social_network: SocialNetwork, filename: str):
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(social_network.to_dict(), f, indent=2, ensure_ascii=False)
-        print(f"✅ Данные сохранены в {filename}")
+    @instrumented("save_to_json", _saved_objects)
+    def save_to_json(social_network: SocialNetwork, filename: str, indent: int | None = 2,
+                     compression: str = None):
+        """Сохранение в JSON; indent=None пишет компактный файл без форматирования.
+
+        Сжатие выбирается по compression или расширению файла (см. open_snapshot).
+        """
+        separators = None if indent is not None else (',', ':')
+        social_network = social_network.snapshot()
+        data = {'meta': _META, **social_network.to_dict()}
+        with open_snapshot(filename, 'w', compression, encoding='utf-8') as f:
+            json.dump(data, f, indent=indent, separators=separators, ensure_ascii=False)
+        logger.info("✅ Данные сохранены в %s", filename)
 
     @staticmethod
-    def load_from_json(filename: str) -> SocialNetwork:
-        with open(filename, 'r', encoding='utf-8') as f:
+    @instrumented("load_from_json", _loaded_objects)
+    def load_from_json(filename: str, network_class: type = None, compression: str = None,
+                       trusted: bool = False) -> SocialNetwork:
+        """Загрузка из JSON.
+
+        trusted=True пропускает валидацию и разбор дат, если файл записан
+        save_to_json с поддерживаемой TRUSTED_VERSION; старые файлы без
+        заголовка грузятся обычным путем.
+        """
+        with open_snapshot(filename, 'r', compression, encoding='utf-8') as f:
             data = json.load(f)
-        print(f"✅ Данные загружены из {filename}")
-        return SocialNetwork.from_dict(data)
+        meta = data.get('meta')
+        trusted = meta is not None and _check_meta(meta, filename, trusted)
+        logger.info("✅ Данные загружены из %s", filename)
+        return (network_class or SocialNetwork).from_dict(data, trusted)
+
+    @staticmethod
+    @instrumented("save_to_jsonl", _saved_objects)
+    def save_to_jsonl(social_network: SocialNetwork, filename: str, compression: str = None):
+        """Сохранение в формате JSON Lines: одна запись на строку"""
+        social_network = social_network.snapshot()
+        with open_snapshot(filename, 'w', compression, encoding='utf-8') as f:
+            SocialNetworkSerializer.write_jsonl(social_network, f)
+        logger.info("✅ Данные сохранены в %s", filename)
+
+    @staticmethod
+    @instrumented("load_from_jsonl", _loaded_objects)
+    def load_from_jsonl(filename: str, network_class: type = None, compression: str = None,
+                        trusted: bool = False) -> SocialNetwork:
+        """Потоковая загрузка из файла JSON Lines (trusted - см. read_jsonl)"""
+        with open_snapshot(filename, 'r', compression, encoding='utf-8') as f:
+            sn = SocialNetworkSerializer.read_jsonl(f, (network_class or SocialNetwork)(), trusted=trusted)
+        logger.info("✅ Данные загружены из %s", filename)
+        return sn
 
     @staticmethod
-    def save_to_xml(social_network: SocialNetwork, filename: str):
-        root = ET.Element("social_network")
+    @instrumented("save_to_shards", _saved_objects)
+    def save_to_shards(social_network: SocialNetwork, directory: str, shards: int = None, workers: int = None):
+        """Параллельное сохранение в каталог: шарды JSON Lines и манифест.
+
+        Пользователи, посты, комментарии и подписки делятся на shards
+        диапазонов id, каждый шард записывает отдельный процесс. Каждый файл
+        шарда - самостоятельный JSON Lines; манифест пишется последним, поэтому
+        недописанный снимок не будет прочитан.
+        """
+        social_network = social_network.snapshot()
+        shards = max(1, shards or os.cpu_count() or 1)
+        source = (
+            social_network.users, social_network.posts, social_network.comments,
+            sorted(social_network.users), sorted(social_network.posts), sorted(social_network.comments),
+            sorted(social_network.graph.edges()), shards,
+        )
+        os.makedirs(directory, exist_ok=True)
+
+        files = [f"shard-{number:04d}.jsonl" for number in range(shards)]
+        paths = [os.path.join(directory, name) for name in files]
+        with _shard_executor(workers or shards, _init_shard_source, (source,)) as executor:
+            counts = list(executor.map(_write_shard, range(shards), paths))
+
+        manifest = {
+            'format': SHARDS_FORMAT,
+            'version': SHARDS_VERSION,
+            'shards': [{'file': name, **shard_counts} for name, shard_counts in zip(files, counts)]
+        }
+        manifest_path = os.path.join(directory, SHARDS_MANIFEST)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(manifest_path + '.tmp', manifest_path)
+        logger.info("✅ Данные сохранены в %s (%d шардов)", directory, shards)
+
+    @staticmethod
+    @instrumented("load_from_shards", _loaded_objects)
+    def load_from_shards(directory: str, network_class: type = None, workers: int = None,
+                         trusted: bool = False) -> SocialNetwork:
+        """Параллельная загрузка снимка из save_to_shards.
+
+        Шарды разбираются и проверяются в отдельных процессах и возвращают
+        кортежи полей; объекты создаются без валидации, а таблицы, индексы
+        и связи по внешним ключам строятся в текущем процессе, как в
+        from_dict. Эта часть последовательная, поэтому выигрыш ограничен
+        долей разбора JSON. Исполнители запускаются через forkserver:
+        запускающий скрипт должен вызывать загрузку под
+        if __name__ == "__main__". trusted - см. read_jsonl.
+        """
+        with open(os.path.join(directory, SHARDS_MANIFEST), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != SHARDS_FORMAT or manifest.get('version', 0) > SHARDS_VERSION:
+            raise SocialNetworkError(f"Неподдерживаемый формат манифеста в {directory}")
+
+        cls = network_class or SocialNetwork
+        paths = [os.path.join(directory, shard['file']) for shard in manifest['shards']]
+        with _shard_executor(workers or len(paths)) as executor:
+            parts = list(executor.map(_read_shard, paths, [cls] * len(paths), [trusted] * len(paths)))
+
+        sn = cls()
+        user_from_dict, post_from_dict, comment_from_dict = cls._record_factories(True)
+        user_fields, post_fields, comment_fields = _SHARD_FIELDS
+        for users, _, _, _ in parts:
+            for row in users:
+                sn._store_user(user_from_dict(dict(zip(user_fields, row))))
+        for _, posts, comments, _ in parts:
+            for row in posts:
+                sn._store_post(post_from_dict(dict(zip(post_fields, row))))
+            for row in comments:
+                sn._store_comment(comment_from_dict(dict(zip(comment_fields, row))))
+
+        for post in sn.posts.values():
+            sn._link_post(post)
+        for comment in sn.comments.values():
+            sn._link_comment(comment)
+        sn.graph.add_edges(edge for _, _, _, follows in parts for edge in follows)
+
+        logger.info("✅ Данные загружены из %s (%d шардов)", directory, len(paths))
+        return sn
+
+    @staticmethod
+    def write_jsonl(social_network: SocialNetwork, file, meta: dict = None):
+        """Потоковая запись записей JSON Lines в текстовый файловый объект.
+
+        Первая строка - заголовок формата (с дополнительными полями из meta),
+        далее пользователи, посты, комментарии и подписки. Связи не
+        записываются: они восстанавливаются по внешним ключам user_id/post_id.
+        """
+        encode = _JSONL_ENCODER.encode
+        file.write(encode({'type': 'meta', **_META, **(meta or {})}) + '\n')
 
-        # Пользователи
-        users_elem = ET.SubElement(root, "users")
         for user in social_network.users.values():
-            user_elem = ET.SubElement(users_elem, "user")
-            user_elem.set("id", str(user.user_id))
-            ET.SubElement(user_elem, "username").text = user.username
-            ET.SubElement(user_elem, "email").text = user.email
-            ET.SubElement(user_elem, "data_registration").text = user.data_registration.isoformat()
-
-            # Сохраняем посты пользователя
-            posts_elem = ET.SubElement(user_elem, "posts")
-            for post in user.posts:
-                ET.SubElement(posts_elem, "post").text = str(post.post_id)
-
-            # Сохраняем комментарии пользователя
-            comments_elem = ET.SubElement(user_elem, "comments")
-            for comment in user.comments:
-                ET.SubElement(comments_elem, "comment").text = str(comment.comment_id)
-
-        # Посты
-        posts_elem = ET.SubElement(root, "posts")
+            file.write(encode(SocialNetworkSerializer._user_record(user)) + '\n')
         for post in social_network.posts.values():
-            post_elem = ET.SubElement(posts_elem, "post")
-            post_elem.set("id", str(post.post_id))
-            ET.SubElement(post_elem, "user_id").text = str(post.user_id)
-            ET.SubElement(post_elem, "text").text = post.text
-            ET.SubElement(post_elem, "created_at").text = post.created_at.isoformat()
-
-            # Сохраняем комментарии поста
-            comments_elem = ET.SubElement(post_elem, "comments")
-            for comment in post.comments:
-                ET.SubElement(comments_elem, "comment").text = str(comment.comment_id)
-
-        # Комментарии
-        comments_elem = ET.SubElement(root, "comments")
+            file.write(encode(SocialNetworkSerializer._post_record(post)) + '\n')
         for comment in social_network.comments.values():
-            comment_elem = ET.SubElement(comments_elem, "comment")
-            comment_elem.set("id", str(comment.comment_id))
-            ET.SubElement(comment_elem, "user_id").text = str(comment.user_id)
-            ET.SubElement(comment_elem, "post_id").text = str(comment.post_id)
-            ET.SubElement(comment_elem, "text").text = comment.text
-            ET.SubElement(comment_elem, "created_at").text = comment.created_at.isoformat()
+            file.write(encode(SocialNetworkSerializer._comment_record(comment)) + '\n')
+        for follower_id, followee_id in social_network.graph.edges():
+            file.write(encode(SocialNetworkSerializer._follow_record('follow', follower_id, followee_id)) + '\n')
+
+    @staticmethod
+    def _user_record(user: User) -> dict:
+        return {
+            'type': 'user',
+            'user_id': user.user_id,
+            'username': user.username,
+            'email': user.email,
+            'data_registration': user.data_registration.isoformat()
+        }
 
-        tree = ET.ElementTree(root)
-        tree.write(filename, encoding='utf-8', xml_declaration=True)
-        print(f"✅ Данные сохранены в {filename}")
+    @staticmethod
+    def _post_record(post: Post) -> dict:
+        return {
+            'type': 'post',
+            'post_id': post.post_id,
+            'user_id': post.user_id,
+            'text': post.text,
+            'created_at': post.created_at.isoformat()
+        }
+
+    @staticmethod
+    def _follow_record(record_type: str, follower_id: int, followee_id: int) -> dict:
+        return {'type': record_type, 'follower_id': follower_id, 'followee_id': followee_id}
+
+    @staticmethod
+    def _comment_record(comment: Comment) -> dict:
+        return {
+            'type': 'comment',
+            'comment_id': comment.comment_id,
+            'user_id': comment.user_id,
+            'post_id': comment.post_id,
+            'text': comment.text,
+            'created_at': comment.created_at.isoformat()
+        }
+
+    @staticmethod
+    def read_jsonl(file, social_network: SocialNetwork | None = None,
+                   skip_existing: bool = False, trusted: bool = False) -> SocialNetwork:
+        """Чтение записей JSON Lines из файлового объекта (или итератора строк).
+
+        Если передана существующая сеть, записи добавляются в неё. При
+        skip_existing записи с уже известными id пропускаются, что делает
+        повторное применение журнала идемпотентным. trusted=True включает
+        быстрый путь без валидации, если заголовок файла объявляет
+        поддерживаемую TRUSTED_VERSION.
+        """
+        sn = social_network if social_network is not None else SocialNetwork()
+        decode = _JSONL_DECODER.decode
+        user_from_dict, post_from_dict, comment_from_dict = sn._record_factories(False)
+        # Подписки до ближайшей отписки добавляются в граф одним пакетом
+        follows = []
+
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                record = decode(line)
+            except ValueError as e:
+                raise SocialNetworkError(f"Ошибка в строке {line_number}: {e}")
+
+            record_type = record.get('type')
+            if record_type == 'comment':
+                if not (skip_existing and record['comment_id'] in sn.comments):
+                    sn._register_comment(comment_from_dict(record))
+            elif record_type == 'post':
+                if not (skip_existing and record['post_id'] in sn.posts):
+                    sn._register_post(post_from_dict(record))
+            elif record_type == 'user':
+                if not (skip_existing and record['user_id'] in sn.users):
+                    sn._register_user(user_from_dict(record))
+            elif record_type == 'follow':
+                follows.append((record['follower_id'], record['followee_id']))
+            elif record_type == 'unfollow':
+                sn.graph.add_edges(follows)
+                follows.clear()
+                sn.graph.unfollow(record['follower_id'], record['followee_id'])
+            elif record_type == 'meta':
+                if _check_meta(record, "JSON Lines", trusted):
+                    user_from_dict, post_from_dict, comment_from_dict = sn._record_factories(True)
+            else:
+                raise SocialNetworkError(f"Неизвестный тип записи в строке {line_number}: {record_type}")
+
+        sn.graph.add_edges(follows)
+        return sn
+
+    @staticmethod
+    @instrumented("save_to_binary", _saved_objects)
+    def save_to_binary(social_network: SocialNetwork, filename: str):
+        """Сохранение в бинарный снимок для чтения через mmap (см. BinarySnapshot).
+
+        Таблицы записей фиксированной ширины отсортированы по id, строки лежат
+        в общей куче в конце файла. Куча сначала пишется во временный файл,
+        поэтому тексты не накапливаются в памяти.
+        """
+        social_network = social_network.snapshot()
+        users = sorted(social_network.users.values(), key=lambda u: u.user_id)
+        posts = sorted(social_network.posts.values(), key=lambda p: p.post_id)
+        comments = sorted(social_network.comments.values(), key=lambda c: c.comment_id)
+
+        users_offset = _BIN_HEADER.size
+        posts_offset = users_offset + len(users) * _BIN_USER.size
+        comments_offset = posts_offset + len(posts) * _BIN_POST.size
+        posts_index_offset = comments_offset + len(comments) * _BIN_COMMENT.size
+        comments_index_offset = posts_index_offset + len(posts) * _BIN_INT.size
+        heap_offset = comments_index_offset + len(comments) * _BIN_INT.size
+
+        with open(filename, 'wb') as f, tempfile.TemporaryFile() as heap:
+            f.seek(users_offset)
+
+            def put(text: str) -> tuple[int, int]:
+                data = text.encode('utf-8')
+                position = heap.tell()
+                heap.write(data)
+                return heap_offset + position, len(data)
+
+            for user in users:
+                f.write(_BIN_USER.pack(user.user_id, _to_epoch_us(user.data_registration),
+                                       *put(user.username), *put(user.email)))
+            for post in posts:
+                f.write(_BIN_POST.pack(post.post_id, post.user_id, _to_epoch_us(post.created_at),
+                                       *put(post.text)))
+            for comment in comments:
+                f.write(_BIN_COMMENT.pack(comment.comment_id, comment.user_id, comment.post_id,
+                                          _to_epoch_us(comment.created_at), *put(comment.text)))
+
+            # Индексы: номера строк, отсортированные по (владелец, время, id)
+            rows = sorted(range(len(posts)), key=lambda i: (posts[i].user_id, posts[i].created_at, posts[i].post_id))
+            f.write(_pack_rows(rows))
+            rows = sorted(range(len(comments)),
+                          key=lambda i: (comments[i].post_id, comments[i].created_at, comments[i].comment_id))
+            f.write(_pack_rows(rows))
+
+            heap_size = heap.tell()
+            heap.seek(0)
+            shutil.copyfileobj(heap, f)
+
+            f.seek(0)
+            f.write(_BIN_HEADER.pack(
+                _BIN_MAGIC, BINARY_VERSION, len(users), len(posts), len(comments),
+                users_offset, posts_offset, comments_offset,
+                posts_index_offset, comments_index_offset, heap_offset, heap_size))
+        logger.info("✅ Данные сохранены в %s", filename)
+
+    @staticmethod
+    def open_binary(filename: str) -> 'BinarySnapshot':
+        """Открытие бинарного снимка только для чтения (без разбора всего файла)"""
+        return BinarySnapshot(filename)
 
     @staticmethod
-    def load_from_xml(filename: str) -> SocialNetwork:
-        """Загрузить социальную сеть из XML файла"""
+    @instrumented("load_from_binary", _loaded_objects)
+    def load_from_binary(filename: str, network_class: type = None) -> SocialNetwork:
+        """Полная загрузка бинарного снимка в обычную сеть"""
+        with BinarySnapshot(filename) as snapshot:
+            sn = snapshot.to_network(network_class)
+        logger.info("✅ Данные загружены из %s", filename)
+        return sn
+
+    @staticmethod
+    @instrumented("save_to_xml", _saved_objects)
+    def save_to_xml(social_network: SocialNetwork, filename: str, compression: str = None):
+        social_network = social_network.snapshot()
+        # Открываем файл так же, как ElementTree.write, чтобы результат совпадал байт в байт
+        with open_snapshot(filename, 'w', compression, encoding='utf-8', errors='xmlcharrefreplace') as f:
+            SocialNetworkSerializer.write_xml(social_network, f)
+        logger.info("✅ Данные сохранены в %s", filename)
+
+    @staticmethod
+    def write_xml(social_network: SocialNetwork, file):
+        """Потоковая запись социальной сети в текстовый файловый объект.
+
+        Каждая запись сериализуется отдельно, поэтому в памяти одновременно
+        находится не больше одного элемента <user>/<post>/<comment>.
+        """
+        file.write("<?xml version='1.0' encoding='utf-8'?>\n<social_network>")
+
+        SocialNetworkSerializer._write_xml_section(
+            file, "users", social_network.users.values(),
+            lambda user: SocialNetworkSerializer._user_to_xml(user, social_network))
+        SocialNetworkSerializer._write_xml_section(
+            file, "posts", social_network.posts.values(),
+            lambda post: SocialNetworkSerializer._post_to_xml(post, social_network))
+        SocialNetworkSerializer._write_xml_section(
+            file, "comments", social_network.comments.values(), SocialNetworkSerializer._comment_to_xml)
+
+        file.write("</social_network>")
+
+    @staticmethod
+    def _write_xml_section(file, tag: str, items, to_element):
+        """Запись одного раздела (users/posts/comments) по одному элементу"""
+        empty = True
+        for item in items:
+            if empty:
+                file.write(f"<{tag}>")
+                empty = False
+            file.write(ET.tostring(to_element(item), encoding='unicode'))
+        # Пустой раздел ElementTree записывает как <tag />
+        file.write(f"<{tag} />" if empty else f"</{tag}>")
+
+    @staticmethod
+    def _user_to_xml(user: User, social_network: SocialNetwork) -> ET.Element:
+        user_elem = ET.Element("user")
+        user_elem.set("id", str(user.user_id))
+        ET.SubElement(user_elem, "username").text = user.username
+        ET.SubElement(user_elem, "email").text = user.email
+        ET.SubElement(user_elem, "data_registration").text = user.data_registration.isoformat()
+
+        # Сохраняем посты пользователя
+        posts_elem = ET.SubElement(user_elem, "posts")
+        for post in social_network._visible_posts(user.posts):
+            ET.SubElement(posts_elem, "post").text = str(post.post_id)
+
+        # Сохраняем комментарии пользователя
+        comments_elem = ET.SubElement(user_elem, "comments")
+        for comment in social_network._visible_comments(user.comments):
+            ET.SubElement(comments_elem, "comment").text = str(comment.comment_id)
+        return user_elem
+
+    @staticmethod
+    def _post_to_xml(post: Post, social_network: SocialNetwork) -> ET.Element:
+        post_elem = ET.Element("post")
+        post_elem.set("id", str(post.post_id))
+        ET.SubElement(post_elem, "user_id").text = str(post.user_id)
+        ET.SubElement(post_elem, "text").text = post.text
+        ET.SubElement(post_elem, "created_at").text = post.created_at.isoformat()
+
+        # Сохраняем комментарии поста
+        comments_elem = ET.SubElement(post_elem, "comments")
+        for comment in social_network._visible_comments(post.comments):
+            ET.SubElement(comments_elem, "comment").text = str(comment.comment_id)
+        return post_elem
+
+    @staticmethod
+    def _comment_to_xml(comment: Comment) -> ET.Element:
+        comment_elem = ET.Element("comment")
+        comment_elem.set("id", str(comment.comment_id))
+        ET.SubElement(comment_elem, "user_id").text = str(comment.user_id)
+        ET.SubElement(comment_elem, "post_id").text = str(comment.post_id)
+        ET.SubElement(comment_elem, "text").text = comment.text
+        ET.SubElement(comment_elem, "created_at").text = comment.created_at.isoformat()
+        return comment_elem
+
+    @staticmethod
+    @instrumented("load_from_xml", _loaded_objects)
+    def load_from_xml(filename: str, network_class: type = None, compression: str = None) -> SocialNetwork:
+        """Потоковая загрузка социальной сети из XML файла.
+
+        Объекты создаются по мере закрытия элементов <user>/<post>/<comment>,
+        обработанные элементы сразу удаляются из дерева. Связи восстанавливаются
+        по внешним ключам user_id/post_id, поэтому списки id внутри
+        пользователей и постов не накапливаются в памяти.
+        """
         try:
-            # Парсим XML
-            tree = ET.parse(filename)
-            root = tree.getroot()
-
-            # Создаем временные структуры для данных
-            users_data = {}
-            posts_data = {}
-            comments_data = {}
-
-            # Читаем пользователей
-            users_elem = root.find('users')
-            if users_elem is not None:
-                for user_elem in users_elem.findall('user'):
-                    user_id = int(user_elem.get('id'))
-
-                    # Читаем посты пользователя
-                    user_posts = []
-                    posts_elem = user_elem.find('posts')
-                    if posts_elem is not None:
-                        for post_elem in posts_elem.findall('post'):
-                            user_posts.append(int(post_elem.text))
-
-                    # Читаем комментарии пользователя
-                    user_comments = []
-                    comments_elem = user_elem.find('comments')
-                    if comments_elem is not None:
-                        for comment_elem in comments_elem.findall('comment'):
-                            user_comments.append(int(comment_elem.text))
-
-                    users_data[user_id] = {
-                        'user_id': user_id,
-                        'username': user_elem.find('username').text,
-                        'email': user_elem.find('email').text,
-                        'data_registration': user_elem.find('data_registration').text,
-                        'posts': user_posts,  # теперь заполняется!
-                        'comments': user_comments  # теперь заполняется!
-                    }
-
-            # Читаем посты
-            posts_elem = root.find('posts')
-            if posts_elem is not None:
-                for post_elem in posts_elem.findall('post'):
-                    post_id = int(post_elem.get('id'))
-
-                    # Читаем комментарии поста
-                    post_comments = []
-                    comments_elem = post_elem.find('comments')
-                    if comments_elem is not None:
-                        for comment_elem in comments_elem.findall('comment'):
-                            post_comments.append(int(comment_elem.text))
-
-                    posts_data[post_id] = {
-                        'post_id': post_id,
-                        'user_id': int(post_elem.find('user_id').text),
-                        'text': post_elem.find('text').text,
-                        'created_at': post_elem.find('created_at').text,
-                        'comments': post_comments  # теперь заполняется!
-                    }
-
-            # Читаем комментарии
-            comments_elem = root.find('comments')
-            if comments_elem is not None:
-                for comment_elem in comments_elem.findall('comment'):
-                    comment_id = int(comment_elem.get('id'))
-                    comments_data[comment_id] = {
-                        'comment_id': comment_id,
-                        'user_id': int(comment_elem.find('user_id').text),
-                        'post_id': int(comment_elem.find('post_id').text),
-                        'text': comment_elem.find('text').text,
-                        'created_at': comment_elem.find('created_at').text
-                    }
-
-            # Собираем все данные в структуру, совместимую с JSON форматом
-            data = {
-                'users': {user_id: user_data for user_id, user_data in users_data.items()},
-                'posts': {post_id: post_data for post_id, post_data in posts_data.items()},
-                'comments': {comment_id: comment_data for comment_id, comment_data in comments_data.items()}
-            }
-
-            print(f"✅ Данные загружены из {filename}")
-            return SocialNetwork.from_dict(data)
+            sn = (network_class or SocialNetwork)()
+            depth = 0
+            section = None
+
+            with open_snapshot(filename, 'rb', compression) as f:
+                for event, elem in ET.iterparse(f, events=('start', 'end')):
+                    if event == 'start':
+                        depth += 1
+                        if depth == 2:
+                            section = elem
+                        continue
+
+                    depth -= 1
+                    if depth != 2:
+                        continue
+
+                    # Закрылась запись верхнего уровня: users/user, posts/post, comments/comment
+                    if section.tag == 'users' and elem.tag == 'user':
+                        user = sn.user_class(
+                            int(elem.get('id')),
+                            elem.findtext('username'),
+                            elem.findtext('email')
+                        )
+                        user.data_registration = datetime.fromisoformat(elem.findtext('data_registration'))
+                        sn._register_user(user)
+
+                    elif section.tag == 'posts' and elem.tag == 'post':
+                        post = sn.post_class(
+                            int(elem.get('id')),
+                            int(elem.findtext('user_id')),
+                            elem.findtext('text')
+                        )
+                        post.created_at = datetime.fromisoformat(elem.findtext('created_at'))
+                        sn._register_post(post)
+
+                    elif section.tag == 'comments' and elem.tag == 'comment':
+                        comment = sn.comment_class(
+                            int(elem.get('id')),
+                            int(elem.findtext('user_id')),
+                            int(elem.findtext('post_id')),
+                            elem.findtext('text')
+                        )
+                        comment.created_at = datetime.fromisoformat(elem.findtext('created_at'))
+                        sn._register_comment(comment)
+
+                    # Освобождаем уже обработанную запись
+                    section.clear()
+
+            logger.info("✅ Данные загружены из %s", filename)
+            return sn
 
         except ET.ParseError as e:
             raise SocialNetworkError(f"Ошибка парсинга XML: {e}")
         except Exception as e:
             raise SocialNetworkError(f"Ошибка при загрузке из XML: {e}")
 
+# Шардированный снимок: каталог с файлами JSON Lines и манифестом
+SHARDS_FORMAT = "social_network_shards"
+SHARDS_VERSION = 1
+SHARDS_MANIFEST = "manifest.json"
+
+# Данные сохраняемой сети в процессе-исполнителе (см. _init_shard_source)
+_shard_source = None
+
+
+def _shard_executor(workers: int, initializer=None, initargs: tuple = ()) -> ProcessPoolExecutor:
+    """Пул процессов для шардов.
+
+    С initializer (запись) исполнители получают сеть через fork, без pickle.
+    fork копирует только вызывающий поток: блокировки, которые в этот момент
+    держат другие потоки (писатели сети, logging), в дочернем процессе не
+    освободятся. Поэтому исполнители записи читают лишь неизменяемый снимок
+    и не пишут в лог, а на платформах без fork сеть передается через pickle.
+    Исполнителям чтения наследовать нечего: они запускаются через
+    forkserver (или spawn) и не копируют состояние родителя.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if initializer is not None:
+        method = 'fork' if 'fork' in methods else None
+    else:
+        method = 'forkserver' if 'forkserver' in methods else None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method),
+                               initializer=initializer, initargs=initargs)
+
+
+def _init_shard_source(source: tuple):
+    global _shard_source
+    _shard_source = source
+
+
+def _chunk(items: list, number: int, shards: int) -> list:
+    """number-й из shards непрерывных диапазонов отсортированного списка"""
+    return items[len(items) * number // shards:len(items) * (number + 1) // shards]
+
+
+def _write_shard(number: int, path: str) -> dict:
+    users, posts, comments, user_ids, post_ids, comment_ids, edges, shards = _shard_source
+    encode = _JSONL_ENCODER.encode
+    counts = {}
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(encode({'type': 'meta', **_META}) + '\n')
+        for name, table, ids, to_record in (
+                ('users', users, user_ids, SocialNetworkSerializer._user_record),
+                ('posts', posts, post_ids, SocialNetworkSerializer._post_record),
+                ('comments', comments, comment_ids, SocialNetworkSerializer._comment_record)):
+            ids = _chunk(ids, number, shards)
+            for record_id in ids:
+                f.write(encode(to_record(table[record_id])) + '\n')
+            counts[name] = len(ids)
+        follows = _chunk(edges, number, shards)
+        for follower_id, followee_id in follows:
+            f.write(encode(SocialNetworkSerializer._follow_record('follow', follower_id, followee_id)) + '\n')
+        counts['follows'] = len(follows)
+    return counts
+
+
+# Поля записей шарда в порядке кортежей, которые возвращает _read_shard
+_SHARD_FIELDS = (
+    ('user_id', 'username', 'email', 'data_registration'),
+    ('post_id', 'user_id', 'text', 'created_at'),
+    ('comment_id', 'user_id', 'post_id', 'text', 'created_at'),
+)
+
+
+def _read_shard(path: str, network_class: type, trusted: bool) -> tuple[list, list, list, list]:
+    """Разбор и проверка шарда: кортежи полей записей и пары подписок.
+
+    Объекты не создаются: кортежи строк и чисел передаются в родительский
+    процесс в разы дешевле. Записи недоверенного файла проверяются здесь
+    конструкторами network_class, поэтому родитель создает объекты без
+    повторной валидации.
+    """
+    users, posts, comments, follows = [], [], [], []
+    user_fields, post_fields, comment_fields = _SHARD_FIELDS
+    decode = _JSONL_DECODER.decode
+    validators = network_class._record_factories(False)
+    user_check, post_check, comment_check = validators
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = decode(line)
+            except ValueError as e:
+                raise SocialNetworkError(f"Ошибка в {path}, строка {line_number}: {e}")
+
+            record_type = record.get('type')
+            if record_type == 'comment':
+                if comment_check is not None:
+                    comment_check(record)
+                comments.append(tuple(record[field] for field in comment_fields))
+            elif record_type == 'post':
+                if post_check is not None:
+                    post_check(record)
+                posts.append(tuple(record[field] for field in post_fields))
+            elif record_type == 'user':
+                if user_check is not None:
+                    user_check(record)
+                users.append(tuple(record[field] for field in user_fields))
+            elif record_type == 'follow':
+                follows.append((record['follower_id'], record['followee_id']))
+            elif record_type == 'meta':
+                if _check_meta(record, path, trusted):
+                    user_check = post_check = comment_check = None
+            else:
+                raise SocialNetworkError(f"Неизвестный тип записи в {path}, строка {line_number}: {record_type}")
+    return users, posts, comments, follows
+
+
+# Бинарный снимок: заголовок, таблицы фиксированной ширины, индексы, куча строк
+BINARY_VERSION = 1
+_BIN_MAGIC = b'SNBIN\x00\x00\x00'
+_BIN_HEADER = struct.Struct('<8sI3q6qq')   # магия, версия, количества, смещения, размер кучи
+_BIN_USER = struct.Struct('<6q')           # user_id, регистрация, username (смещение, длина), email
+_BIN_POST = struct.Struct('<5q')           # post_id, user_id, created_at, text (смещение, длина)
+_BIN_COMMENT = struct.Struct('<6q')        # comment_id, user_id, post_id, created_at, text
+_BIN_INT = struct.Struct('<q')             # номер строки в индексе или отдельное поле записи
+
+
+def _pack_rows(rows: list[int]) -> bytes:
+    return struct.pack(f'<{len(rows)}q', *rows)
+
+
+class BinarySnapshot:
+    """Бинарный снимок, открытый через mmap только для чтения.
+
+    Открытие читает лишь заголовок; записи декодируются при обращении прямо
+    из отображенных страниц, которые несколько процессов разделяют через
+    страничный кэш ОС. Поиск по id и выборки постов пользователя и
+    комментариев поста выполняются бинарным поиском.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SocialNetworkError(f"Файл {filename} пуст")
+        self._buffer = memoryview(self._mmap)
+
+        (magic, version, self.user_count, self.post_count, self.comment_count,
+         self._users, self._posts, self._comments, self._posts_index, self._comments_index,
+         _, _) = _BIN_HEADER.unpack_from(self._buffer, 0)
+        if magic != _BIN_MAGIC or version > BINARY_VERSION:
+            self.close()
+            raise SocialNetworkError(f"Файл {filename} не является бинарным снимком версии {BINARY_VERSION}")
+
+    def close(self):
+        if self._file is None:
+            return
+        self._buffer.release()
+        self._mmap.close()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) -> 'BinarySnapshot':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _text(self, offset: int, length: int) -> str:
+        return str(self._buffer[offset:offset + length], 'utf-8')
+
+    def _user_at(self, row: int, user_class: type = User) -> User:
+        user_id, registered, name_offset, name_length, email_offset, email_length = \
+            _BIN_USER.unpack_from(self._buffer, self._users + row * _BIN_USER.size)
+        user = user_class(user_id, self._text(name_offset, name_length), self._text(email_offset, email_length))
+        user.data_registration = _from_epoch_us(registered)
+        return user
+
+    def _post_at(self, row: int, post_class: type = Post) -> Post:
+        post_id, user_id, created, text_offset, text_length = \
+            _BIN_POST.unpack_from(self._buffer, self._posts + row * _BIN_POST.size)
+        post = post_class(post_id, user_id, self._text(text_offset, text_length))
+        post.created_at = _from_epoch_us(created)
+        return post
+
+    def _comment_at(self, row: int, comment_class: type = Comment) -> Comment:
+        comment_id, user_id, post_id, created, text_offset, text_length = \
+            _BIN_COMMENT.unpack_from(self._buffer, self._comments + row * _BIN_COMMENT.size)
+        comment = comment_class(comment_id, user_id, post_id, self._text(text_offset, text_length))
+        comment.created_at = _from_epoch_us(created)
+        return comment
+
+    def _find(self, table: int, size: int, count: int, field_offset: int, value: int,
+              index: int = None) -> int:
+        """Первая строка (или позиция в индексе), где поле >= value"""
+        low, high = 0, count
+        buffer = self._buffer
+        while low < high:
+            middle = (low + high) // 2
+            row = middle if index is None else _BIN_INT.unpack_from(buffer, index + middle * _BIN_INT.size)[0]
+            if _BIN_INT.unpack_from(buffer, table + row * size + field_offset)[0] < value:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _find_row(self, table: int, size: int, count: int, item_id: int) -> int | None:
+        row = self._find(table, size, count, 0, item_id)
+        if row < count and _BIN_INT.unpack_from(self._buffer, table + row * size)[0] == item_id:
+            return row
+        return None
+
+    def get_user(self, user_id: int) -> User | None:
+        row = self._find_row(self._users, _BIN_USER.size, self.user_count, user_id)
+        return None if row is None else self._user_at(row)
+
+    def get_post(self, post_id: int) -> Post | None:
+        row = self._find_row(self._posts, _BIN_POST.size, self.post_count, post_id)
+        return None if row is None else self._post_at(row)
+
+    def get_comment(self, comment_id: int) -> Comment | None:
+        row = self._find_row(self._comments, _BIN_COMMENT.size, self.comment_count, comment_id)
+        return None if row is None else self._comment_at(row)
+
+    def _owned(self, table: int, size: int, count: int, index: int, owner_offset: int, owner_id: int):
+        """Номера строк с заданным владельцем через индекс, по возрастанию времени"""
+        position = self._find(table, size, count, owner_offset, owner_id, index)
+        buffer = self._buffer
+        while position < count:
+            row = _BIN_INT.unpack_from(buffer, index + position * _BIN_INT.size)[0]
+            if _BIN_INT.unpack_from(buffer, table + row * size + owner_offset)[0] != owner_id:
+                break
+            yield row
+            position += 1
+
+    def posts_of(self, user_id: int) -> list[Post]:
+        """Посты пользователя по возрастанию времени"""
+        return [self._post_at(row) for row in
+                self._owned(self._posts, _BIN_POST.size, self.post_count, self._posts_index, 8, user_id)]
+
+    def comments_of(self, post_id: int) -> list[Comment]:
+        """Комментарии к посту по возрастанию времени"""
+        return [self._comment_at(row) for row in
+                self._owned(self._comments, _BIN_COMMENT.size, self.comment_count, self._comments_index, 16, post_id)]
+
+    def users(self):
+        return (self._user_at(row) for row in range(self.user_count))
+
+    def posts(self):
+        return (self._post_at(row) for row in range(self.post_count))
+
+    def comments(self):
+        return (self._comment_at(row) for row in range(self.comment_count))
+
+    def to_network(self, network_class: type = None) -> SocialNetwork:
+        """Полное восстановление сети из снимка"""
+        sn = (network_class or SocialNetwork)()
+        for row in range(self.user_count):
+            sn._register_user(self._user_at(row, sn.user_class))
+        for row in range(self.post_count):
+            sn._register_post(self._post_at(row, sn.post_class))
+        for row in range(self.comment_count):
+            sn._register_comment(self._comment_at(row, sn.comment_class))
+        return sn
+
+
+def _read_generation(lines) -> int | None:
+    """Номер поколения из заголовка снимка или журнала; None, если заголовка нет"""
+    for line in lines:
+        record = _JSONL_DECODER.decode(line) if line.strip() else {}
+        if record.get('type') != 'meta':
+            return None
+        return record.get('log_generation', 0)
+    return None
+
+
+class ChangeLog:
+    """Инкрементальное сохранение: снимок JSON Lines + журнал изменений.
+
+    Каждое add_user/add_post/add_comment дописывает одну строку в журнал,
+    поэтому стоимость сохранения зависит от числа изменений, а не от
+    размера сети. Каждые compact_every записей сеть сбрасывается в новый
+    снимок, а журнал очищается.
+
+    Снимок и журнал помечены номером поколения (log_generation в заголовке).
+    Сжатие увеличивает номер и начинает журнал заново; журнал со старым
+    номером после сбоя между записью снимка и очисткой уже вошел в снимок и
+    пропускается целиком. Журнал текущего поколения применяется полностью:
+    повторная запись с тем же id заменяет прежнюю.
+    """
+
+    def __init__(self, snapshot_path: str, log_path: str = None,
+                 compact_every: int = 10_000, fsync: bool = False):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path or snapshot_path + '.log'
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.network = None
+        self._file = None
+        self._records = 0
+        self.generation = 0
+
+    def open(self, network_class: type = None) -> SocialNetwork:
+        """Загрузка последнего снимка, применение журнала и подключение к сети"""
+        sn = (network_class or SocialNetwork)()
+        self.generation = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                self.generation = _read_generation(f) or 0
+                f.seek(0)
+                SocialNetworkSerializer.read_jsonl(f, sn, trusted=True)
+        self._records = self._replay(sn) if os.path.exists(self.log_path) else None
+
+        self.network = sn
+        sn.change_log = self
+        if self._records is None:
+            # Журнала нет или он уже вошел в снимок: начинаем новый
+            self._start_log()
+        else:
+            self._file = open(self.log_path, 'a', encoding='utf-8')
+        logger.info("✅ Данные загружены из %s (записей в журнале: %d)", self.snapshot_path, self._records)
+        return sn
+
+    def _replay(self, sn: SocialNetwork) -> int | None:
+        """Применение журнала; недописанная последняя строка отбрасывается.
+
+        Возвращает число записей или None, если журнал старше снимка.
+        """
+        valid_size = 0
+        lines = []
+        with open(self.log_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                valid_size += len(line)
+                lines.append(line.decode('utf-8'))
+
+        # Журнал без заголовка записан до появления поколений и относится к снимку
+        generation = _read_generation(lines)
+        if not lines or generation is not None and generation < self.generation:
+            return None
+        SocialNetworkSerializer.read_jsonl(lines, sn)
+
+        if valid_size != os.path.getsize(self.log_path):
+            os.truncate(self.log_path, valid_size)
+        return len(lines) - (generation is not None)
+
+    def append_user(self, user: User):
+        self._append(SocialNetworkSerializer._user_record(user))
+
+    def append_post(self, post: Post):
+        self._append(SocialNetworkSerializer._post_record(post))
+
+    def append_comment(self, comment: Comment):
+        self._append(SocialNetworkSerializer._comment_record(comment))
+
+    def append_follow(self, follower_id: int, followee_id: int):
+        self._append(SocialNetworkSerializer._follow_record('follow', follower_id, followee_id))
+
+    def append_unfollow(self, follower_id: int, followee_id: int):
+        self._append(SocialNetworkSerializer._follow_record('unfollow', follower_id, followee_id))
+
+    def _append(self, record: dict):
+        if self._file is None:
+            raise SocialNetworkError("Журнал изменений не открыт")
+        self._file.write(_JSONL_ENCODER.encode(record) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+        self._records += 1
+        if self.compact_every and self._records >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Запись полного снимка следующего поколения и очистка журнала"""
+        generation = self.generation + 1
+        temp_path = self.snapshot_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            SocialNetworkSerializer.write_jsonl(self.network, f, {'log_generation': generation})
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+        self.generation = generation
+        self._file.close()
+        self._start_log()
+        logger.info("✅ Снимок сохранен в %s", self.snapshot_path)
+
+    def _start_log(self):
+        """Новый журнал с заголовком текущего поколения"""
+        self._file = open(self.log_path, 'w', encoding='utf-8')
+        self._file.write(_JSONL_ENCODER.encode({'type': 'meta', **_META, 'log_generation': self.generation}) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._records = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.network is not None:
+            self.network.change_log = None
+            self.network = None
+
+    def __enter__(self) -> 'ChangeLog':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 def main():
     """Демонстрация работы"""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     try:
         # Создание социальной сети
         sn = SocialNetwork()
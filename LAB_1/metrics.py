@@ -0,0 +1,134 @@
+"""Инструментирование операций социальной сети.
+
+Для каждой операции собираются число вызовов и ошибок, суммарное, минимальное
+и максимальное время, гистограмма задержек и число обработанных объектов.
+По умолчанию сбор выключен: обертка проверяет один флаг и сразу вызывает
+исходную функцию.
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# Верхние границы корзин гистограммы задержек, в секундах
+LATENCY_BUCKETS = (1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0, float('inf'))
+
+
+def _bucket_label(bound: float) -> str:
+    if bound == float('inf'):
+        return "+inf"
+    if bound < 1e-3:
+        return f"<={bound * 1e6:g}us"
+    if bound < 1:
+        return f"<={bound * 1e3:g}ms"
+    return f"<={bound:g}s"
+
+
+class OperationStats:
+    __slots__ = ('calls', 'errors', 'total', 'min', 'max', 'objects', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.objects = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def to_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_s': self.total,
+            'mean_s': self.total / self.calls if self.calls else 0.0,
+            'min_s': self.min if self.calls else 0.0,
+            'max_s': self.max,
+            'objects': self.objects,
+            'histogram': {_bucket_label(bound): count
+                          for bound, count in zip(LATENCY_BUCKETS, self.buckets) if count},
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self._operations: dict[str, OperationStats] = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._operations = {}
+
+    def record(self, name: str, elapsed: float, objects: int = 0, error: bool = False):
+        with self._lock:
+            stats = self._operations.get(name)
+            if stats is None:
+                stats = self._operations[name] = OperationStats()
+            stats.calls += 1
+            stats.errors += error
+            stats.total += elapsed
+            stats.min = min(stats.min, elapsed)
+            stats.max = max(stats.max, elapsed)
+            stats.objects += objects
+            stats.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+
+    @contextmanager
+    def timer(self, name: str, objects: int = 0):
+        """Замер участка кода; при выключенном сборе ничего не делает"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, objects, error)
+
+    def report(self) -> dict:
+        """Структурированный отчет: операция -> статистика"""
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in sorted(self._operations.items())}
+
+    def to_json(self, indent: int | None = 2) -> str:
+        return json.dumps(self.report(), indent=indent, ensure_ascii=False)
+
+
+# Общий сборщик для всех операций
+metrics = Metrics()
+
+
+def instrumented(name: str, objects=None):
+    """Декоратор замера вызовов функции.
+
+    objects(args, result) возвращает число обработанных объектов; без него
+    каждый вызов считается одним объектом.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except BaseException:
+                metrics.record(name, time.perf_counter() - start, 0, error=True)
+                raise
+            count = objects(args, result) if objects is not None else 1
+            metrics.record(name, time.perf_counter() - start, count)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,239 @@
+"""Инвертированный индекс для полнотекстового поиска по постам и комментариям.
+
+Индекс пополняется по одному документу, поддерживает поиск по словам и
+фразам (в двойных кавычках) с ранжированием BM25 и сохраняется в JSON
+рядом со снимками социальной сети. Top-k выбирается с отсечением MaxScore
+по верхним границам вклада каждого слова.
+"""
+import heapq
+import itertools
+import json
+import math
+import re
+
+INDEX_FORMAT = "search_index"
+INDEX_VERSION = 1
+
+# Буквы и цифры любого алфавита (латиница, кириллица и т.д.)
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_PHRASE_RE = re.compile(r'"([^"]*)"')
+
+# Параметры BM25
+_K1 = 1.2
+_B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    """Разбиение текста на нормализованные слова"""
+    return _TOKEN_RE.findall(text.casefold().replace('ё', 'е'))
+
+
+class SearchIndex:
+    def __init__(self):
+        self._docs: list[tuple[str, int] | None] = []   # номер документа -> (тип, id)
+        self._doc_numbers: dict[tuple[str, int], int] = {}
+        self._lengths: list[int] = []
+        self._postings: dict[str, dict[int, list[int]]] = {}
+        # слово -> [наибольшая частота, наименьшая длина документа]; после
+        # удалений граница может быть завышена, но остается верной
+        self._limits: dict[str, list[int]] = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._doc_numbers)
+
+    def add(self, kind: str, doc_id: int, text: str):
+        """Добавление документа (kind - 'post' или 'comment')"""
+        key = (kind, doc_id)
+        if key in self._doc_numbers:
+            raise ValueError(f"Документ {kind} {doc_id} уже проиндексирован")
+
+        doc_number = len(self._docs)
+        self._docs.append(key)
+        self._doc_numbers[key] = doc_number
+
+        tokens = tokenize(text)
+        self._lengths.append(len(tokens))
+        self._total_length += len(tokens)
+
+        positions: dict[str, list[int]] = {}
+        for position, token in enumerate(tokens):
+            positions.setdefault(token, []).append(position)
+        postings = self._postings
+        limits = self._limits
+        length = len(tokens)
+        for token, token_positions in positions.items():
+            term_postings = postings.get(token)
+            if term_postings is None:
+                postings[token] = {doc_number: token_positions}
+                limits[token] = [len(token_positions), length]
+            else:
+                term_postings[doc_number] = token_positions
+                limit = limits[token]
+                if len(token_positions) > limit[0]:
+                    limit[0] = len(token_positions)
+                if length < limit[1]:
+                    limit[1] = length
+
+    def remove(self, kind: str, doc_id: int, text: str):
+        """Удаление документа; нужен исходный текст, чтобы найти его слова"""
+        doc_number = self._doc_numbers.pop((kind, doc_id), None)
+        if doc_number is None:
+            return
+        for token in set(tokenize(text)):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(doc_number, None)
+                if not postings:
+                    del self._postings[token]
+                    del self._limits[token]
+        self._docs[doc_number] = None
+        self._total_length -= self._lengths[doc_number]
+        self._lengths[doc_number] = 0
+
+    def search(self, query: str, k: int = 10, kind: str = None) -> list[tuple[float, str, int]]:
+        """Top-k документов по запросу: список (оценка, тип, id) по убыванию оценки.
+
+        Фразы в двойных кавычках должны встречаться в документе целиком и
+        подряд; остальные слова объединяются по ИЛИ.
+        """
+        phrases = [tokenize(phrase) for phrase in _PHRASE_RE.findall(query)]
+        phrases = [phrase for phrase in phrases if phrase]
+        terms = tokenize(_PHRASE_RE.sub(' ', query))
+        all_terms = set(terms).union(*phrases)
+        if not all_terms:
+            return []
+
+        if phrases:
+            candidates = None
+            for phrase in phrases:
+                matched = self._phrase_docs(phrase)
+                candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return []
+        else:
+            candidates = None
+
+        return [(score, *self._docs[doc]) for score, doc in self._top_k(all_terms, k, candidates, kind)]
+
+    def _phrase_docs(self, phrase: list[str]) -> set[int]:
+        """Документы, содержащие слова фразы подряд"""
+        postings = [self._postings.get(token) for token in phrase]
+        if not all(postings):
+            return set()
+
+        # Начинаем с самого редкого слова фразы
+        rarest = min(range(len(phrase)), key=lambda i: len(postings[i]))
+        result = set()
+        for doc in postings[rarest]:
+            if not all(doc in p for p in postings):
+                continue
+            position_sets = [set(p[doc]) for p in postings]
+            for position in postings[rarest][doc]:
+                start = position - rarest
+                if all(start + i in position_sets[i] for i in range(len(phrase))):
+                    result.add(doc)
+                    break
+        return result
+
+    def _top_k(self, terms: set[str], k: int, candidates: set[int] | None,
+               kind: str | None) -> list[tuple[float, int]]:
+        """Top-k документов по BM25 с отсечением MaxScore: список (оценка, номер).
+
+        Слова обходятся по убыванию верхней границы вклада. Как только сумма
+        границ оставшихся слов не превышает k-ю лучшую оценку, новый
+        документ в top-k уже не попадет: длинные списки частых слов не
+        обходятся, а только дополняют оценки найденных документов.
+        """
+        documents = len(self._doc_numbers)
+        if not documents or k <= 0:
+            return []
+        average_length = self._total_length / documents or 1
+        lengths = self._lengths
+        docs = self._docs
+        length_norm = _K1 * _B / average_length
+        base_norm = _K1 * (1 - _B)
+
+        terms_info = []
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+            max_tf, min_length = self._limits[term]
+            bound = idf * max_tf * (_K1 + 1) / (max_tf + base_norm + length_norm * min_length)
+            terms_info.append((bound, idf, postings))
+        terms_info.sort(key=lambda info: info[0], reverse=True)
+        # remaining[i] - сумма границ слов i и дальше
+        remaining = list(itertools.accumulate((info[0] for info in reversed(terms_info)), initial=0.0))[::-1]
+
+        scores: dict[int, float] = {}
+        for number, (_, idf, postings) in enumerate(terms_info):
+            weight = idf * (_K1 + 1)
+            threshold = heapq.nlargest(k, scores.values())[-1] if len(scores) >= k else None
+            if threshold is None or remaining[number] > threshold:
+                for doc, positions in postings.items():
+                    if candidates is not None and doc not in candidates:
+                        continue
+                    if kind is not None and docs[doc][0] != kind:
+                        continue
+                    tf = len(positions)
+                    scores[doc] = scores.get(doc, 0.0) + weight * tf / (tf + base_norm + length_norm * lengths[doc])
+                continue
+
+            # Новые документы не пройдут порог: дополняем только те, что еще могут
+            scores = {doc: score for doc, score in scores.items() if score + remaining[number] >= threshold}
+            if len(scores) <= len(postings):
+                for doc in scores:
+                    positions = postings.get(doc)
+                    if positions is not None:
+                        tf = len(positions)
+                        scores[doc] += weight * tf / (tf + base_norm + length_norm * lengths[doc])
+            else:
+                for doc, positions in postings.items():
+                    if doc in scores:
+                        tf = len(positions)
+                        scores[doc] += weight * tf / (tf + base_norm + length_norm * lengths[doc])
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(score, doc) for doc, score in top]
+
+    def save(self, filename: str):
+        """Сохранение индекса в JSON"""
+        docs = [[*key, self._lengths[number]] if key is not None else None
+                for number, key in enumerate(self._docs)]
+        data = {
+            'format': INDEX_FORMAT,
+            'version': INDEX_VERSION,
+            'docs': docs,
+            'postings': {term: [[doc, positions] for doc, positions in postings.items()]
+                         for term, postings in self._postings.items()}
+        }
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, filename: str) -> 'SearchIndex':
+        """Загрузка индекса из JSON"""
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format') != INDEX_FORMAT or data.get('version', 0) > INDEX_VERSION:
+            raise ValueError(f"Неподдерживаемый формат индекса в {filename}")
+
+        index = cls()
+        for number, doc in enumerate(data['docs']):
+            if doc is None:
+                index._docs.append(None)
+                index._lengths.append(0)
+                continue
+            kind, doc_id, length = doc
+            index._docs.append((kind, doc_id))
+            index._doc_numbers[(kind, doc_id)] = number
+            index._lengths.append(length)
+            index._total_length += length
+        index._postings = {term: {doc: positions for doc, positions in postings}
+                           for term, postings in data['postings'].items()}
+        lengths = index._lengths
+        index._limits = {term: [max(map(len, postings.values())), min(lengths[doc] for doc in postings)]
+                         for term, postings in index._postings.items()}
+        return index
@@ -0,0 +1,109 @@
+"""Инкрементальная статистика активности в социальной сети.
+
+Счетчики обновляются при каждом добавлении поста или комментария, поэтому
+запросы для дашбордов не обходят граф объектов заново. Рейтинги хранятся в
+"ленивых" кучах: при изменении счетчика в кучу добавляется новая запись, а
+устаревшие отбрасываются при запросе top-k.
+"""
+import heapq
+import threading
+from datetime import date
+
+
+class TopCounter:
+    """Счетчики по ключам с запросом top-k за O(k log n) (амортизированно)"""
+
+    def __init__(self):
+        self._counts: dict[int, int] = {}
+        self._heap: list[tuple[int, int]] = []   # (-счетчик, ключ), включая устаревшие
+        # Запрос top-k перестраивает кучу - читатели не должны делать это одновременно
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __getitem__(self, key: int) -> int:
+        return self._counts.get(key, 0)
+
+    def add(self, key: int, delta: int = 1):
+        count = self._counts.get(key, 0) + delta
+        if count:
+            self._counts[key] = count
+            heapq.heappush(self._heap, (-count, key))
+        else:
+            self._counts.pop(key, None)
+        # Устаревших записей стало слишком много - пересобираем кучу
+        if len(self._heap) > 2 * len(self._counts) + 64:
+            self._heap = [(-value, item) for item, value in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    def top(self, k: int = 10) -> list[tuple[int, int]]:
+        """k ключей с наибольшими счетчиками: пары (ключ, счетчик); при равенстве - меньший ключ"""
+        with self._lock:
+            heap, counts = self._heap, self._counts
+            result, seen = [], set()
+            while heap and len(result) < k:
+                negative, key = heapq.heappop(heap)
+                if key in seen or counts.get(key) != -negative:
+                    continue
+                seen.add(key)
+                result.append((key, -negative))
+            # Актуальные записи возвращаем обратно
+            for key, count in result:
+                heapq.heappush(heap, (-count, key))
+            return result
+
+    def items(self):
+        return self._counts.items()
+
+
+class EngagementStats:
+    def __init__(self):
+        self.post_comments = TopCounter()    # post_id -> комментариев к посту
+        self.user_posts = TopCounter()       # user_id -> постов пользователя
+        self.user_comments = TopCounter()    # user_id -> комментариев пользователя
+        self.daily_posts: dict[date, int] = {}
+        self.daily_comments: dict[date, int] = {}
+
+    def add_post(self, post, delta: int = 1):
+        """Учет поста; delta=-1 снимает учет замененного поста"""
+        self.user_posts.add(post.user_id, delta)
+        self._add_day(self.daily_posts, post.created_at.date(), delta)
+
+    def add_comment(self, comment, delta: int = 1):
+        self.post_comments.add(comment.post_id, delta)
+        self.user_comments.add(comment.user_id, delta)
+        self._add_day(self.daily_comments, comment.created_at.date(), delta)
+
+    @staticmethod
+    def _add_day(histogram: dict[date, int], day: date, delta: int):
+        count = histogram.get(day, 0) + delta
+        if count:
+            histogram[day] = count
+        else:
+            histogram.pop(day, None)
+
+    def comment_count(self, post_id: int) -> int:
+        return self.post_comments[post_id]
+
+    def user_activity(self, user_id: int) -> dict:
+        return {'posts': self.user_posts[user_id], 'comments': self.user_comments[user_id]}
+
+    def top_posts(self, k: int = 10) -> list[tuple[int, int]]:
+        """Самые комментируемые посты: (post_id, комментариев)"""
+        return self.post_comments.top(k)
+
+    def top_commenters(self, k: int = 10) -> list[tuple[int, int]]:
+        """Самые активные комментаторы: (user_id, комментариев)"""
+        return self.user_comments.top(k)
+
+    def top_authors(self, k: int = 10) -> list[tuple[int, int]]:
+        """Пользователи с наибольшим числом постов: (user_id, постов)"""
+        return self.user_posts.top(k)
+
+    def daily_activity(self, start: date = None, end: date = None) -> list[tuple[date, int, int]]:
+        """Гистограмма по дням в [start, end]: (день, постов, комментариев)"""
+        days = sorted(set(self.daily_posts) | set(self.daily_comments))
+        return [(day, self.daily_posts.get(day, 0), self.daily_comments.get(day, 0))
+                for day in days
+                if (start is None or day >= start) and (end is None or day <= end)]
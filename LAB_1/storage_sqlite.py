@@ -0,0 +1,528 @@
+"""Хранение социальной сети в SQLite.
+
+SQLiteStorage - файл базы с пулом соединений, пакетной записью в
+транзакциях и индексированными запросами по id, пользователю и времени.
+open_network() возвращает LazySocialNetwork: таблицы users/posts/comments
+читаются из базы по мере обращения, а User.posts/User.comments/
+Post.comments подгружаются только при первом доступе.
+"""
+import queue
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from datetime import datetime
+
+from main import (
+    SocialNetwork, SocialNetworkError, User, Post, Comment, ValidationError, logger,
+    _to_epoch_us, _from_epoch_us
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    email TEXT NOT NULL,
+    email_key TEXT NOT NULL UNIQUE,
+    data_registration INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS posts (
+    post_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS comments (
+    comment_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    post_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_by_user ON posts (user_id, created_at, post_id);
+CREATE INDEX IF NOT EXISTS posts_by_time ON posts (created_at, post_id);
+CREATE INDEX IF NOT EXISTS comments_by_post ON comments (post_id, created_at, comment_id);
+CREATE INDEX IF NOT EXISTS comments_by_user ON comments (user_id, comment_id);
+"""
+
+_USER_COLUMNS = "user_id, username, email, data_registration"
+_POST_COLUMNS = "post_id, user_id, text, created_at"
+_COMMENT_COLUMNS = "comment_id, user_id, post_id, text, created_at"
+
+# Вставка с заменой по первичному ключу. В отличие от INSERT OR REPLACE,
+# конфликт по username/email не удаляет чужую строку, а дает IntegrityError.
+_UPSERT = {
+    table: (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT({columns[0]}) DO UPDATE SET "
+            + ", ".join(f"{column} = excluded.{column}" for column in columns[1:]))
+    for table, columns in (
+        ("users", ("user_id", "username", "email", "email_key", "data_registration")),
+        ("posts", ("post_id", "user_id", "text", "created_at")),
+        ("comments", ("comment_id", "user_id", "post_id", "text", "created_at")),
+    )
+}
+
+
+def _user_params(user: User) -> tuple:
+    return (user.user_id, user.username, user.email, user.email.lower(),
+            _to_epoch_us(user.data_registration))
+
+
+def _post_params(post: Post) -> tuple:
+    return (post.post_id, post.user_id, post.text, _to_epoch_us(post.created_at))
+
+
+def _comment_params(comment: Comment) -> tuple:
+    return (comment.comment_id, comment.user_id, comment.post_id, comment.text,
+            _to_epoch_us(comment.created_at))
+
+
+def _time_range(column: str, start: datetime | None, end: datetime | None) -> tuple[str, list]:
+    """Условие на диапазон времени [start, end] и его параметры"""
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f"{column} >= ?")
+        params.append(_to_epoch_us(start))
+    if end is not None:
+        conditions.append(f"{column} <= ?")
+        params.append(_to_epoch_us(end))
+    return "".join(f" AND {condition}" for condition in conditions), params
+
+
+class SQLiteStorage:
+    def __init__(self, path: str, pool_size: int = 4):
+        self.path = path
+        self.pool_size = pool_size
+        self._pool: queue.Queue = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+        with self.connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: транзакции открываются явно через transaction()
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Соединение из пула; новые создаются, пока не достигнут pool_size"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.pool_size
+                if create:
+                    self._created += 1
+            conn = self._connect() if create else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self, conn: sqlite3.Connection = None):
+        """Транзакция на переданном соединении или на соединении из пула"""
+        if conn is not None:
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return
+
+        with self.connection() as pooled, self.transaction(pooled):
+            yield pooled
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        self._created = 0
+
+    # Запись
+
+    def save(self, social_network: SocialNetwork, batch_size: int = 10_000):
+        """Пакетная запись всей сети в одной транзакции"""
+        with self.transaction() as conn:
+            self._insert_many(conn, "users", _user_params, social_network.users.values(), batch_size)
+            self._insert_many(conn, "posts", _post_params, social_network.posts.values(), batch_size)
+            self._insert_many(conn, "comments", _comment_params, social_network.comments.values(), batch_size)
+        logger.info("✅ Данные сохранены в %s", self.path)
+
+    @staticmethod
+    def _insert_many(conn: sqlite3.Connection, table: str, to_params, items, batch_size: int):
+        batch = []
+        for item in items:
+            batch.append(to_params(item))
+            if len(batch) >= batch_size:
+                SQLiteStorage._insert_rows(conn, table, batch)
+                batch = []
+        if batch:
+            SQLiteStorage._insert_rows(conn, table, batch)
+
+    @staticmethod
+    def _insert_rows(conn: sqlite3.Connection, table: str, rows: list[tuple]):
+        try:
+            conn.executemany(_UPSERT[table], rows)
+        except sqlite3.IntegrityError as e:
+            raise ValidationError(f"Нарушена уникальность в таблице {table}: {e}")
+
+    # Чтение
+
+    @staticmethod
+    def _user_from_row(row, user_class=User) -> User:
+        user = user_class(row[0], row[1], row[2])
+        user.data_registration = _from_epoch_us(row[3])
+        return user
+
+    @staticmethod
+    def _post_from_row(row, post_class=Post) -> Post:
+        post = post_class(row[0], row[1], row[2])
+        post.created_at = _from_epoch_us(row[3])
+        return post
+
+    @staticmethod
+    def _comment_from_row(row, comment_class=Comment) -> Comment:
+        comment = comment_class(row[0], row[1], row[2], row[3])
+        comment.created_at = _from_epoch_us(row[4])
+        return comment
+
+    def get_user(self, user_id: int) -> User | None:
+        with self.connection() as conn:
+            row = conn.execute(f"SELECT {_USER_COLUMNS} FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        return self._user_from_row(row) if row else None
+
+    def get_post(self, post_id: int) -> Post | None:
+        with self.connection() as conn:
+            row = conn.execute(f"SELECT {_POST_COLUMNS} FROM posts WHERE post_id = ?", (post_id,)).fetchone()
+        return self._post_from_row(row) if row else None
+
+    def get_comment(self, comment_id: int) -> Comment | None:
+        with self.connection() as conn:
+            row = conn.execute(f"SELECT {_COMMENT_COLUMNS} FROM comments WHERE comment_id = ?",
+                               (comment_id,)).fetchone()
+        return self._comment_from_row(row) if row else None
+
+    def posts_by_user(self, user_id: int, start: datetime = None, end: datetime = None) -> list[Post]:
+        """Посты пользователя по возрастанию времени (индекс posts_by_user)"""
+        condition, params = _time_range("created_at", start, end)
+        with self.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {_POST_COLUMNS} FROM posts WHERE user_id = ?{condition} "
+                f"ORDER BY created_at, post_id", [user_id, *params]).fetchall()
+        return [self._post_from_row(row) for row in rows]
+
+    def posts_between(self, start: datetime = None, end: datetime = None) -> list[Post]:
+        """Посты за период по возрастанию времени (индекс posts_by_time)"""
+        condition, params = _time_range("created_at", start, end)
+        with self.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {_POST_COLUMNS} FROM posts WHERE 1{condition} "
+                f"ORDER BY created_at, post_id", params).fetchall()
+        return [self._post_from_row(row) for row in rows]
+
+    def open_network(self) -> 'LazySocialNetwork':
+        return LazySocialNetwork(self)
+
+
+class _LazyUser(User):
+    """Пользователь, чьи посты и комментарии подгружаются при первом обращении"""
+
+    def __init__(self, user_id: int, username: str, email: str):
+        super().__init__(user_id, username, email)
+        self._network = None
+
+    @property
+    def posts(self) -> list[Post]:
+        if self._posts is None:
+            self._posts = self._network._children("posts", "user_id", self.user_id)
+        return self._posts
+
+    @posts.setter
+    def posts(self, value: list[Post] | None):
+        self._posts = value
+
+    @property
+    def comments(self) -> list[Comment]:
+        if self._comments is None:
+            self._comments = self._network._children("comments", "user_id", self.user_id)
+        return self._comments
+
+    @comments.setter
+    def comments(self, value: list[Comment] | None):
+        self._comments = value
+
+    def add_post(self, post: Post):
+        # Если список еще не загружен, пост попадет в него при загрузке из базы
+        if self._posts is not None:
+            self._posts.append(post)
+
+    def add_comment(self, comment: Comment):
+        if self._comments is not None:
+            self._comments.append(comment)
+
+    def remove_post(self, post: Post):
+        if self._posts is not None:
+            self._posts = [p for p in self._posts if p is not post]
+
+    def remove_comment(self, comment: Comment):
+        if self._comments is not None:
+            self._comments = [c for c in self._comments if c is not comment]
+
+
+class _LazyPost(Post):
+    """Пост, чьи комментарии подгружаются при первом обращении"""
+
+    def __init__(self, post_id: int, user_id: int, text: str):
+        super().__init__(post_id, user_id, text)
+        self._network = None
+
+    @property
+    def comments(self) -> list[Comment]:
+        if self._comments is None:
+            self._comments = self._network._children("comments", "post_id", self.post_id)
+        return self._comments
+
+    @comments.setter
+    def comments(self, value: list[Comment] | None):
+        self._comments = value
+
+    def add_comment(self, comment: Comment):
+        if self._comments is not None:
+            self._comments.append(comment)
+
+    def remove_comment(self, comment: Comment):
+        if self._comments is not None:
+            self._comments = [c for c in self._comments if c is not comment]
+
+
+class _Table(MutableMapping):
+    """Таблица сети поверх SQLite: чтение по требованию с кэшем, запись сразу в базу"""
+
+    def __init__(self, network: 'LazySocialNetwork', table: str, key: str, columns: str,
+                 from_row, to_params):
+        self._network = network
+        self._table = table
+        self._key = key
+        self._columns = columns
+        self._from_row = from_row
+        self._to_params = to_params
+        self._cache: dict = {}
+
+    def __getitem__(self, item_id):
+        item = self._cache.get(item_id)
+        if item is None:
+            rows = self._network._execute(
+                f"SELECT {self._columns} FROM {self._table} WHERE {self._key} = ?", (item_id,))
+            if not rows:
+                raise KeyError(item_id)
+            item = self._load(rows[0])
+        return item
+
+    def _load(self, row):
+        """Объект по строке выборки: из кэша или новый, который кэшируется"""
+        item = self._cache.get(row[0])
+        if item is None:
+            item = self._network._hydrate(self._from_row(row))
+            self._cache[row[0]] = item
+        return item
+
+    def where(self, condition: str, params) -> list:
+        """Выборка объектов одним запросом (строки берутся целиком, без запроса на каждый id)"""
+        rows = self._network._execute(f"SELECT {self._columns} FROM {self._table} WHERE {condition}", params)
+        return [self._load(row) for row in rows]
+
+    def __contains__(self, item_id):
+        if item_id in self._cache:
+            return True
+        return bool(self._network._execute(f"SELECT 1 FROM {self._table} WHERE {self._key} = ?", (item_id,)))
+
+    def __setitem__(self, item_id, item):
+        with self._network._connection() as conn:
+            SQLiteStorage._insert_rows(conn, self._table, [self._to_params(item)])
+        self._cache[item_id] = item
+
+    def drop_cache(self):
+        """Сброс кэша: после отката транзакции в нем могут быть несуществующие объекты"""
+        self._cache.clear()
+
+    def __delitem__(self, item_id):
+        raise SocialNetworkError(f"Удаление записей из таблицы {self._table} не поддерживается")
+
+    def __len__(self):
+        return self._network._execute(f"SELECT COUNT(*) FROM {self._table}")[0][0]
+
+    # Обходы держат соединение, пока не будут исчерпаны или закрыты
+
+    def __iter__(self):
+        with self._network._connection() as conn:
+            for (item_id,) in conn.execute(f"SELECT {self._key} FROM {self._table} ORDER BY {self._key}"):
+                yield item_id
+
+    def values(self):
+        """Потоковый обход без заполнения кэша (например, для сериализации)"""
+        with self._network._connection() as conn:
+            for row in conn.execute(f"SELECT {self._columns} FROM {self._table} ORDER BY {self._key}"):
+                cached = self._cache.get(row[0])
+                yield cached if cached is not None else self._network._hydrate(self._from_row(row))
+
+    def items(self):
+        for item in self.values():
+            yield getattr(item, self._key), item
+
+
+class LazySocialNetwork(SocialNetwork):
+    """Социальная сеть, открытая из SQLite без предварительной загрузки данных.
+
+    Поиск по имени, email и времени выполняется запросами к индексам базы,
+    поэтому индексы в памяти не строятся. Подписки (graph) и полнотекстовый
+    поиск в базе не хранятся.
+
+    Каждый запрос берет соединение из пула storage, поэтому сеть можно
+    читать из нескольких потоков. batch() закрепляет за своим потоком
+    соединение транзакции: чтения этого потока видят ее незакоммиченные
+    записи.
+    """
+    user_class = _LazyUser
+    post_class = _LazyPost
+
+    def __init__(self, storage: SQLiteStorage):
+        super().__init__()
+        self.storage = storage
+        # Соединение транзакции batch() в текущем потоке
+        self._local = threading.local()
+        self.users = _Table(self, "users", "user_id", _USER_COLUMNS,
+                            lambda row: SQLiteStorage._user_from_row(row, _LazyUser), _user_params)
+        self.posts = _Table(self, "posts", "post_id", _POST_COLUMNS,
+                            lambda row: SQLiteStorage._post_from_row(row, _LazyPost), _post_params)
+        self.comments = _Table(self, "comments", "comment_id", _COMMENT_COLUMNS,
+                               SQLiteStorage._comment_from_row, _comment_params)
+
+    def _hydrate(self, item):
+        """Объект из базы: связи будут загружены при первом обращении"""
+        if isinstance(item, _LazyUser):
+            item._network = self
+            item.posts = None
+            item.comments = None
+        elif isinstance(item, _LazyPost):
+            item._network = self
+            item.comments = None
+        return item
+
+    def _children(self, table: str, key: str, owner_id: int) -> list:
+        """Загрузка постов/комментариев владельца по индексу"""
+        target = self.posts if table == "posts" else self.comments
+        id_column = "post_id" if table == "posts" else "comment_id"
+        return target.where(f"{key} = ? ORDER BY {id_column}", (owner_id,))
+
+    @contextmanager
+    def _connection(self):
+        """Соединение транзакции batch() текущего потока или соединение из пула"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        with self.storage.connection() as conn:
+            yield conn
+
+    def _execute(self, sql: str, params=()) -> list:
+        with self._connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    @contextmanager
+    def batch(self):
+        """Группировка многих add_* в одну транзакцию; вложенный batch() входит во внешний.
+
+        При откате кэши таблиц сбрасываются: в них попали вставленные объекты,
+        а в списки posts/comments загруженных владельцев - их связи.
+        """
+        if getattr(self._local, 'conn', None) is not None:
+            yield self
+            return
+        with self.storage.transaction() as conn:
+            self._local.conn = conn
+            try:
+                yield self
+            except BaseException:
+                for table in (self.users, self.posts, self.comments):
+                    table.drop_cache()
+                raise
+            finally:
+                self._local.conn = None
+
+    def bulk_add(self, users=(), posts=(), comments=()) -> tuple[int, int, int]:
+        with self.batch():
+            return super().bulk_add(users, posts, comments)
+
+    def close(self):
+        """Соединения принадлежат пулу и закрываются через storage.close()"""
+
+    # Таблицы и уникальность хранит база - индексы в памяти не нужны
+
+    def _store_user(self, user: User):
+        if isinstance(user, _LazyUser):
+            user._network = self
+        self.users[user.user_id] = user
+
+    def _store_post(self, post: Post):
+        if isinstance(post, _LazyPost):
+            post._network = self
+        self.posts[post.post_id] = post
+
+    def _store_comment(self, comment: Comment):
+        self.comments[comment.comment_id] = comment
+
+    def _username_owner(self, username: str) -> int | None:
+        rows = self._execute("SELECT user_id FROM users WHERE username = ?", (username,))
+        return rows[0][0] if rows else None
+
+    def _email_owner(self, email: str) -> int | None:
+        rows = self._execute("SELECT user_id FROM users WHERE email_key = ?", (email,))
+        return rows[0][0] if rows else None
+
+    def find_user_by_username(self, username: str) -> User | None:
+        user_id = self._username_owner(username)
+        return self.users[user_id] if user_id is not None else None
+
+    def find_user_by_email(self, email: str) -> User | None:
+        user_id = self._email_owner(email.lower())
+        return self.users[user_id] if user_id is not None else None
+
+    def posts_between(self, start: datetime = None, end: datetime = None, user_id: int = None) -> list[Post]:
+        condition, params = _time_range("created_at", start, end)
+        if user_id is not None:
+            condition += " AND user_id = ?"
+            params.append(user_id)
+        return self.posts.where(f"1{condition} ORDER BY created_at, post_id", params)
+
+    def comments_between(self, post_id: int, start: datetime = None, end: datetime = None) -> list[Comment]:
+        condition, params = _time_range("created_at", start, end)
+        return self.comments.where(f"post_id = ?{condition} ORDER BY created_at, comment_id",
+                                   [post_id, *params])
+
+    def feed(self, user_ids, limit: int = 20, cursor: str = None) -> tuple[list[Post], str | None]:
+        user_ids = list(set(user_ids))
+        if not user_ids:
+            return [], None
+        condition, params = "", []
+        if cursor is not None:
+            created_at, post_id = cursor.rsplit('|', 1)
+            condition = " AND (created_at, post_id) < (?, ?)"
+            params = [_to_epoch_us(datetime.fromisoformat(created_at)), int(post_id)]
+        placeholders = ", ".join("?" * len(user_ids))
+        page = self.posts.where(
+            f"user_id IN ({placeholders}){condition} ORDER BY created_at DESC, post_id DESC LIMIT ?",
+            [*user_ids, *params, limit + 1])
+        next_cursor = None
+        if len(page) > limit:
+            page.pop()
+            next_cursor = f"{page[-1].created_at.isoformat()}|{page[-1].post_id}"
+        return page, next_cursor
@@ -0,0 +1,668 @@
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+
+from benchmark import compare_with_baseline, serialization_paths, serializer_benchmark
+from compact import CompactSocialNetwork
+from generator import generate_data
+from graph import FollowerGraph
+from main import (
+    COMPRESSIONS, BulkIngestError, ChangeLog, ConcurrentSocialNetwork, SocialNetwork,
+    SocialNetworkError, SocialNetworkSerializer, ValidationError
+)
+from metrics import metrics
+from search_index import SearchIndex
+from storage_sqlite import SQLiteStorage
+
+
+def summary(sn, follows=True):
+    """Содержимое сети без учета порядка: записи, связи и подписки"""
+    result = {
+        'users': {user.user_id: (user.username, user.email, user.data_registration,
+                                 sorted(p.post_id for p in user.posts),
+                                 sorted(c.comment_id for c in user.comments))
+                  for user in sn.users.values()},
+        'posts': {post.post_id: (post.user_id, post.text, post.created_at,
+                                 sorted(c.comment_id for c in post.comments))
+                  for post in sn.posts.values()},
+        'comments': {comment.comment_id: (comment.user_id, comment.post_id, comment.text, comment.created_at)
+                     for comment in sn.comments.values()},
+    }
+    if follows:
+        result['follows'] = sorted(sn.graph.edges())
+    return result
+
+
+def make_network(network_class=SocialNetwork, users=20, seed=1):
+    return network_class.from_dict(generate_data(users, seed, follows_per_user=3))
+
+
+def sample_path(name):
+    """Файл с примером сети рядом с тестами"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+
+
+class TempDirTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+
+class TestSerializers(TempDirTestCase):
+    """Сохранение и загрузка во всех форматах"""
+
+    def setUp(self):
+        super().setUp()
+        self.sn = make_network()
+
+    def test1_dict_round_trip(self):
+        """to_dict/from_dict восстанавливает связи по внешним ключам"""
+        loaded = SocialNetwork.from_dict(self.sn.to_dict())
+        self.assertEqual(summary(loaded), summary(self.sn))
+        self.assertTrue(loaded.integrity_report.ok)
+
+    def test2_xml_round_trip(self):
+        """Потоковая загрузка XML: сохраненная сеть и пример из репозитория"""
+        path = self.path("network.xml")
+        SocialNetworkSerializer.save_to_xml(self.sn, path)
+        loaded = SocialNetworkSerializer.load_from_xml(path)
+        self.assertEqual(summary(loaded, follows=False), summary(self.sn, follows=False))
+        self.assertTrue(loaded.integrity_report.ok)
+
+        sample = SocialNetworkSerializer.load_from_xml(sample_path("social_network_simple.xml"))
+        self.assertEqual(sample.to_dict(),
+                         SocialNetworkSerializer.load_from_json(sample_path("social_network_simple.json")).to_dict())
+
+    def test32_xml_writer(self):
+        """Потоковая запись XML: разделы по порядку, спецсимволы экранируются"""
+        sn = SocialNetwork()
+        sn.add_user(1, "ivan", "ivan@example.com")
+        sn.add_post(10, 1, 'Текст с <тегом> & "кавычками"')
+        sn.add_comment(100, 1, 10, "a < b")
+        buffer = io.StringIO()
+        SocialNetworkSerializer.write_xml(sn, buffer)
+        root = ET.fromstring(buffer.getvalue().encode('utf-8'))
+        self.assertEqual([section.tag for section in root], ['users', 'posts', 'comments'])
+        self.assertEqual(root.find('posts/post/text').text, 'Текст с <тегом> & "кавычками"')
+        self.assertEqual(root.find('users/user/posts/post').text, '10')
+        self.assertEqual(root.find('comments/comment/text').text, "a < b")
+
+        empty = io.StringIO()
+        SocialNetworkSerializer.write_xml(SocialNetwork(), empty)
+        self.assertIn("<users /><posts /><comments />", empty.getvalue())
+
+    def test33_jsonl_round_trip(self):
+        """JSON Lines: заголовок и запись на строку, чтение из итератора строк"""
+        path = self.path("network.jsonl")
+        SocialNetworkSerializer.save_to_jsonl(self.sn, path)
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(json.loads(lines[0])['type'], 'meta')
+        self.assertEqual(len(lines), 1 + len(self.sn.users) + len(self.sn.posts) + len(self.sn.comments)
+                         + len(self.sn.graph))
+        self.assertEqual(summary(SocialNetworkSerializer.read_jsonl(iter(lines))), summary(self.sn))
+        self.assertEqual(summary(SocialNetworkSerializer.load_from_jsonl(path)), summary(self.sn))
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"type": "meta", "format": "other", "version": 1}\n')
+        with self.assertRaises(SocialNetworkError):
+            SocialNetworkSerializer.load_from_jsonl(path)
+
+    def test34_compact_entities(self):
+        """Компактные сущности: та же сеть, без __dict__, связи по id"""
+        compact = CompactSocialNetwork.from_dict(self.sn.to_dict())
+        self.assertEqual(summary(compact), summary(self.sn))
+        user = compact.users[1]
+        for item in (user, next(iter(compact.posts.values())), next(iter(compact.comments.values()))):
+            self.assertFalse(hasattr(item, '__dict__'))
+        compact.add_post(90_000, 1, "Новый пост")
+        compact.add_comment(90_000, 2, 90_000, "Комментарий")
+        self.assertEqual(user.posts[-1].post_id, 90_000)
+        self.assertEqual([c.comment_id for c in compact.posts[90_000].comments], [90_000])
+
+    def test3_compression(self):
+        """JSON, JSON Lines и XML с каждым кодеком; кодек выбирается по расширению файла"""
+        formats = (
+            (SocialNetworkSerializer.save_to_json, SocialNetworkSerializer.load_from_json, '.json', True),
+            (SocialNetworkSerializer.save_to_jsonl, SocialNetworkSerializer.load_from_jsonl, '.jsonl', True),
+            (SocialNetworkSerializer.save_to_xml, SocialNetworkSerializer.load_from_xml, '.xml', False),
+        )
+        for save, load, extension, follows in formats:
+            for codec in ('none', *COMPRESSIONS):
+                with self.subTest(format=extension, codec=codec):
+                    path = self.path(f"network-{codec}{extension}")
+                    save(self.sn, path, compression=codec)
+                    loaded = load(path, compression=codec)
+                    self.assertEqual(summary(loaded, follows), summary(self.sn, follows))
+                    self.assertTrue(loaded.integrity_report.ok)
+
+        path = self.path("network.jsonl.gz")
+        SocialNetworkSerializer.save_to_jsonl(self.sn, path)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(2), b'\x1f\x8b')
+        self.assertEqual(summary(SocialNetworkSerializer.load_from_jsonl(path)), summary(self.sn))
+
+    def test4_trusted_load(self):
+        """Доверенная загрузка собственных снимков дает ту же сеть"""
+        self.assertEqual(summary(SocialNetwork.from_dict(self.sn.to_dict(), trusted=True)), summary(self.sn))
+        SocialNetworkSerializer.save_to_json(self.sn, self.path("network.json"))
+        SocialNetworkSerializer.save_to_jsonl(self.sn, self.path("network.jsonl"))
+        for load, name in ((SocialNetworkSerializer.load_from_json, "network.json"),
+                           (SocialNetworkSerializer.load_from_jsonl, "network.jsonl")):
+            loaded = load(self.path(name), trusted=True)
+            self.assertEqual(summary(loaded), summary(self.sn))
+
+    def test5_binary_snapshot(self):
+        """Бинарный снимок: полная загрузка и точечные запросы через mmap"""
+        path = self.path("network.bin")
+        SocialNetworkSerializer.save_to_binary(self.sn, path)
+        loaded = SocialNetworkSerializer.load_from_binary(path)
+        self.assertEqual(summary(loaded, follows=False), summary(self.sn, follows=False))
+
+        post = next(iter(self.sn.posts.values()))
+        with SocialNetworkSerializer.open_binary(path) as snapshot:
+            self.assertEqual(snapshot.get_post(post.post_id).text, post.text)
+            self.assertIsNone(snapshot.get_user(-1))
+            self.assertEqual([p.post_id for p in snapshot.posts_of(post.user_id)],
+                             [p.post_id for p in self.sn.posts_between(user_id=post.user_id)])
+            self.assertEqual([c.comment_id for c in snapshot.comments_of(post.post_id)],
+                             [c.comment_id for c in self.sn.comments_between(post.post_id)])
+
+    def test6_shards(self):
+        """Шардированный снимок сохраняется и загружается пулом процессов"""
+        directory = self.path("shards")
+        SocialNetworkSerializer.save_to_shards(self.sn, directory, shards=3, workers=2)
+        self.assertEqual(len([name for name in os.listdir(directory) if name.startswith('shard-')]), 3)
+        loaded = SocialNetworkSerializer.load_from_shards(directory, workers=2)
+        self.assertEqual(summary(loaded), summary(self.sn))
+
+    def test29_shard_validation(self):
+        """Исполнители проверяют записи недоверенного шарда, доверенный путь дает ту же сеть"""
+        directory = self.path("shards")
+        SocialNetworkSerializer.save_to_shards(self.sn, directory, shards=2, workers=2)
+        loaded = SocialNetworkSerializer.load_from_shards(directory, CompactSocialNetwork, workers=2, trusted=True)
+        self.assertEqual(summary(loaded), summary(self.sn))
+
+        with open(os.path.join(directory, "shard-0001.jsonl"), 'a', encoding='utf-8') as f:
+            f.write('{"type":"user","user_id":-1,"username":"","email":"x@example.com",'
+                    '"data_registration":"2024-01-01T00:00:00"}\n')
+        with self.assertRaises(ValidationError):
+            SocialNetworkSerializer.load_from_shards(directory, workers=2)
+
+    def test7_bad_files(self):
+        """Поврежденный XML дает SocialNetworkError"""
+        path = self.path("broken.xml")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('<social_network><users>')
+        with self.assertRaises(SocialNetworkError):
+            SocialNetworkSerializer.load_from_xml(path)
+
+
+class TestChangeLog(TempDirTestCase):
+    """Инкрементальное сохранение через журнал"""
+
+    def test8_replay(self):
+        """Изменения восстанавливаются из снимка и журнала"""
+        path = self.path("network.jsonl")
+        with ChangeLog(path, compact_every=3) as log:
+            sn = log.open()
+            sn.add_user(1, "ivan", "ivan@example.com")
+            sn.add_user(2, "maria", "maria@example.com")
+            sn.add_post(10, 1, "Первый пост")
+            sn.add_comment(100, 2, 10, "Отличный пост")
+            sn.follow(2, 1)
+            expected = summary(sn)
+        self.assertTrue(os.path.exists(path))
+
+        with ChangeLog(path) as log:
+            self.assertEqual(summary(log.open()), expected)
+
+    def test9_torn_tail(self):
+        """Недописанная последняя строка журнала отбрасывается"""
+        path = self.path("network.jsonl")
+        with ChangeLog(path, compact_every=0) as log:
+            sn = log.open()
+            sn.add_user(1, "ivan", "ivan@example.com")
+            expected = summary(sn)
+        with open(path + '.log', 'a', encoding='utf-8') as f:
+            f.write('{"type": "user", "user_id": 2, "usern')
+
+        with ChangeLog(path) as log:
+            self.assertEqual(summary(log.open()), expected)
+        with open(path + '.log', 'rb') as f:
+            self.assertTrue(f.read().endswith(b'\n'))
+
+    def test23_updates_after_compaction(self):
+        """Замены после сжатия применяются, журнал старого поколения пропускается"""
+        path = self.path("network.jsonl")
+        with ChangeLog(path, compact_every=3) as log:
+            sn = log.open()
+            sn.add_user(1, "ivan", "ivan@example.com")
+            sn.add_user(2, "maria", "maria@example.com")
+            sn.add_post(10, 1, "Первый пост")
+            sn._register_post(sn.post_class.from_dict({**sn.posts[10].to_dict(), 'text': "Исправленный пост"}))
+            sn.change_log.append_post(sn.posts[10])
+            sn._register_user(sn.user_class.from_dict({**sn.users[1].to_dict(), 'username': "ivan_new"}))
+            sn.change_log.append_user(sn.users[1])
+            expected = summary(sn)
+        with open(path + '.log', encoding='utf-8') as f:
+            stale_log = f.read()
+
+        with ChangeLog(path) as log:
+            sn = log.open()
+            self.assertEqual(summary(sn), expected)
+            self.assertEqual(sn.posts[10].text, "Исправленный пост")
+            self.assertEqual([p.post_id for p in sn.users[1].posts], [10])
+
+            # Сбой между записью снимка и очисткой журнала: старый журнал уже в снимке
+            sn.add_user(3, "ivan", "ivan2@example.com")
+            log.compact()
+            expected = summary(sn)
+        with open(path + '.log', 'w', encoding='utf-8') as f:
+            f.write(stale_log)
+        with ChangeLog(path) as log:
+            self.assertEqual(summary(log.open()), expected)
+
+
+class TestQueries(unittest.TestCase):
+    """Индексы, лента, поиск, подписки и счетчики"""
+
+    def setUp(self):
+        self.sn = make_network(users=30, seed=2)
+
+    def test10_user_lookup(self):
+        """Поиск пользователя по имени и email без учета регистра"""
+        self.assertEqual(self.sn.find_user_by_username("user_3").user_id, 3)
+        self.assertEqual(self.sn.find_user_by_email("USER_3@Example.com").user_id, 3)
+        self.assertIsNone(self.sn.find_user_by_username("nobody"))
+        with self.assertRaises(ValidationError):
+            self.sn.add_user(1000, "user_3", "other@example.com")
+
+    def test11_time_ranges(self):
+        """Выборки постов и комментариев за период совпадают с полным перебором"""
+        start, end = datetime(2024, 6, 1), datetime(2024, 12, 31)
+        expected = sorted((p for p in self.sn.posts.values() if start <= p.created_at <= end),
+                          key=lambda p: (p.created_at, p.post_id))
+        self.assertEqual(self.sn.posts_between(start, end), expected)
+
+        by_user = [p for p in expected if p.user_id == 5]
+        self.assertEqual(self.sn.posts_between(start, end, user_id=5), by_user)
+
+        post = max(self.sn.posts.values(), key=lambda p: len(p.comments))
+        self.assertEqual(self.sn.comments_between(post.post_id),
+                         sorted(post.comments, key=lambda c: (c.created_at, c.comment_id)))
+
+    def test12_feed_pagination(self):
+        """Страницы ленты идут без пропусков и повторов"""
+        user_ids = [1, 2, 3, 4, 5]
+        expected = sorted((p for p in self.sn.posts.values() if p.user_id in user_ids),
+                          key=lambda p: (p.created_at, p.post_id), reverse=True)
+        pages, cursor = [], None
+        while True:
+            page, cursor = self.sn.feed(user_ids, limit=3, cursor=cursor)
+            self.assertLessEqual(len(page), 3)
+            pages.extend(page)
+            if cursor is None:
+                break
+        self.assertEqual(pages, expected)
+
+    def test25_feed_one_author(self):
+        """Лента, где страницы целиком заняты одним автором, а посты добавлены не по порядку"""
+        sn = SocialNetwork()
+        for user_id in range(1, 41):
+            sn.add_user(user_id, f"user_{user_id}", f"user_{user_id}@example.com")
+        post_id = 0
+        for user_id in range(40, 0, -1):
+            for day in ((user_id * 7) % 30, 1, 15):
+                post_id += 1
+                sn.add_post(post_id, user_id, "Пост")
+                sn.posts[post_id].created_at = datetime(2024, 1, 1) + timedelta(days=day)
+        for day in range(40, 70):
+            post_id += 1
+            sn.add_post(post_id, 7, "Пост")
+            sn.posts[post_id].created_at = datetime(2024, 1, 1) + timedelta(days=day)
+        # Индексы строятся заново по итоговым датам
+        sn = SocialNetwork.from_dict(sn.to_dict())
+
+        user_ids = list(range(1, 41))
+        expected = sorted(sn.posts.values(), key=lambda p: (p.created_at, p.post_id), reverse=True)
+        pages, cursor = [], None
+        while True:
+            page, cursor = sn.feed(user_ids, limit=4, cursor=cursor)
+            pages.extend(page)
+            if cursor is None:
+                break
+        self.assertEqual(pages, expected)
+
+    def test13_bulk_add(self):
+        """Пакетная загрузка: все ошибки сразу и без частичных изменений"""
+        sn = SocialNetwork()
+        sn.bulk_add(users=[(1, "ivan", "ivan@example.com")],
+                    posts={'post_id': [10], 'user_id': [1], 'text': ["Пост"]})
+        with self.assertRaises(BulkIngestError) as context:
+            sn.bulk_add(users=[(2, "ivan", "x@example.com")], posts=[(11, 5, "Пост"), (12, 1, "")])
+        self.assertEqual(len(context.exception.errors), 3)
+        self.assertEqual((len(sn.users), len(sn.posts)), (1, 1))
+
+    def test14_integrity_report(self):
+        """Висячие ссылки при загрузке попадают в отчет"""
+        data = {
+            'users': {1: {'user_id': 1, 'username': "ivan", 'email': "ivan@example.com",
+                          'data_registration': "2024-01-01T00:00:00", 'posts': [10, 11]}},
+            'posts': {10: {'post_id': 10, 'user_id': 1, 'text': "Пост", 'created_at': "2024-01-02T00:00:00"},
+                      12: {'post_id': 12, 'user_id': 7, 'text': "Пост", 'created_at': "2024-01-02T00:00:00"}},
+            'comments': {100: {'comment_id': 100, 'user_id': 1, 'post_id': 99, 'text': "Комментарий",
+                               'created_at': "2024-01-03T00:00:00"}},
+        }
+        report = SocialNetwork.from_dict(data).integrity_report
+        self.assertFalse(report.ok)
+        self.assertEqual(report.orphan_posts, [12])
+        self.assertEqual(report.orphan_comments, [100])
+        self.assertEqual(len(report.mismatches), 1)
+
+    def test15_search(self):
+        """Полнотекстовый поиск: слова, фразы и сохранение индекса"""
+        sn = SocialNetwork()
+        sn.add_user(1, "ivan", "ivan@example.com")
+        sn.enable_search()
+        sn.add_post(10, 1, "Отличная погода для прогулки в парке")
+        sn.add_post(11, 1, "Парк закрыт, погода плохая")
+        sn.add_comment(100, 1, 10, "Прогулка в парке - отличная идея")
+
+        self.assertEqual({obj.post_id for _, obj in sn.search("погода", kind='post')}, {10, 11})
+        self.assertEqual([obj.post_id for _, obj in sn.search('"погода для прогулки"')], [10])
+        self.assertEqual([obj.comment_id for _, obj in sn.search("идея")], [100])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index.json')
+            sn.search_index.save(path)
+            self.assertEqual(SearchIndex.load(path).search("парк"), sn.search_index.search("парк"))
+
+    def test24_search_pruning(self):
+        """Отсечение MaxScore дает те же оценки, что и полный перебор"""
+        words = [f"слово{i}" for i in range(50)]
+        index = SearchIndex()
+        for doc_id in range(600):
+            text = ' '.join(words[(doc_id * 7 + i * i) % (5 + doc_id % 45)] for i in range(3 + doc_id % 11))
+            index.add('post' if doc_id % 4 else 'comment', doc_id, text)
+        index.remove('post', 1, ' '.join(words[(7 + i * i) % 6] for i in range(4)))
+
+        for query in ("слово0", "слово0 слово1 слово40", "слово3 слово44", "слово2 слово5 слово9 слово30"):
+            for kind in (None, 'comment'):
+                with self.subTest(query=query, kind=kind):
+                    full = index.search(query, k=len(index), kind=kind)
+                    pruned = index.search(query, k=5, kind=kind)
+                    self.assertEqual([round(score, 9) for score, *_ in pruned],
+                                     [round(score, 9) for score, *_ in full[:5]])
+
+    def test16_graph(self):
+        """Подписки, рекомендации и CSR-представление"""
+        sn = SocialNetwork()
+        for user_id in range(1, 6):
+            sn.add_user(user_id, f"user_{user_id}", f"user_{user_id}@example.com")
+        for follower_id, followee_id in ((1, 2), (1, 3), (2, 4), (3, 4), (3, 5)):
+            self.assertTrue(sn.follow(follower_id, followee_id))
+        self.assertFalse(sn.follow(1, 2))
+        with self.assertRaises(ValidationError):
+            sn.follow(1, 1)
+
+        self.assertEqual([(user.user_id, common) for user, common in sn.recommend_users(1)], [(4, 2), (5, 1)])
+        sn.graph.freeze()
+        self.assertTrue(sn.graph.is_following(1, 3))
+        self.assertEqual(sn.graph.mutual_followers(2, 3), 1)
+        self.assertEqual(sn.graph.followers(4), [2, 3])
+        self.assertTrue(sn.unfollow(1, 3))
+        self.assertEqual(sn.graph.following(1), [2])
+        self.assertEqual(len(sn.graph), 4)
+
+    def test26_graph_changes(self):
+        """Подписки и отписки поверх CSR совпадают с множеством ребер, копия независима"""
+        graph = FollowerGraph.from_edges([(1, 2), (1, 3), (2, 1), (1, 2)])
+        self.assertEqual((len(graph), graph.following(1)), (3, [2, 3]))
+        expected = set(graph.edges())
+        for followee_id in range(4, 3000):
+            self.assertTrue(graph.follow(1, followee_id))
+            expected.add((1, followee_id))
+        copy = graph.copy()
+        for followee_id in range(2, 3000, 3):
+            self.assertTrue(graph.unfollow(1, followee_id))
+            expected.discard((1, followee_id))
+        self.assertFalse(graph.unfollow(1, 2))
+        self.assertTrue(graph.follow(1, 2))
+        expected.add((1, 2))
+
+        self.assertEqual(sorted(graph.edges()), sorted(expected))
+        self.assertEqual(graph.following(1), sorted(followee for follower, followee in expected if follower == 1))
+        self.assertEqual(graph.followers(2), [1])
+        self.assertEqual(len(copy), 2999)
+        graph.freeze()
+        self.assertTrue(graph.frozen)
+        self.assertEqual((len(graph), sorted(graph.edges())), (len(expected), sorted(expected)))
+
+    def test17_stats(self):
+        """Счетчики активности совпадают с полным перебором"""
+        stats = self.sn.enable_stats()
+        post = self.sn.add_post(10_000, 1, "Новый пост")
+        self.sn.add_comment(10_000, 2, post.post_id, "Комментарий")
+
+        counts = {p.post_id: len(p.comments) for p in self.sn.posts.values()}
+        expected = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:5]
+        self.assertEqual(stats.top_posts(5), expected)
+        self.assertEqual(stats.user_activity(1)['posts'], len(self.sn.users[1].posts))
+
+    def test18_metrics(self):
+        """Метрики собираются только после включения"""
+        metrics.reset()
+        self.sn.add_user(5000, "metrics_user", "metrics@example.com")
+        self.assertEqual(metrics.report(), {})
+        metrics.enable()
+        try:
+            self.sn.add_user(5001, "metrics_user_2", "metrics2@example.com")
+        finally:
+            metrics.disable()
+        self.assertEqual(metrics.report()['add_user']['calls'], 1)
+        metrics.reset()
+
+    def test22_replace_records(self):
+        """Повторное добавление с тем же id заменяет запись в индексах и связях"""
+        sn = SocialNetwork()
+        sn.add_user(1, "ivan", "ivan@example.com")
+        sn.add_user(2, "maria", "maria@example.com")
+        sn.add_post(10, 1, "Первый вариант")
+        sn.add_comment(100, 2, 10, "Комментарий")
+        sn.add_comment(100, 1, 10, "Исправленный комментарий")
+        post = sn.add_post(10, 2, "Второй вариант")
+
+        self.assertEqual(sn.posts_between(), [post])
+        self.assertEqual(sn.posts_between(user_id=1), [])
+        self.assertEqual(sn.posts_between(user_id=2), [post])
+        self.assertEqual(sn.feed([1, 2])[0], [post])
+        self.assertEqual(sn.users[1].posts, [])
+        self.assertEqual([c.text for c in sn.comments_between(10)], ["Исправленный комментарий"])
+        self.assertEqual([c.text for c in post.comments], ["Исправленный комментарий"])
+        self.assertEqual(sn.users[2].comments, [])
+        self.assertEqual(len(sn.users[1].comments), 1)
+
+
+class TestConcurrency(TempDirTestCase):
+    """Снимки ConcurrentSocialNetwork при одновременной записи"""
+
+    def test19_snapshot_under_writer(self):
+        """Снимок не меняется, пока писатель добавляет записи"""
+        sn = make_network(ConcurrentSocialNetwork)
+        stop = threading.Event()
+        errors = []
+
+        def writer():
+            try:
+                for post_id in range(100_000, 102_000):
+                    if stop.is_set():
+                        break
+                    post = sn.add_post(post_id, post_id % 20, f"Пост {post_id}")
+                    sn.add_comment(post_id, (post_id + 1) % 20, post.post_id, "Комментарий")
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for number in range(5):
+                snapshot = sn.snapshot()
+                sizes = (len(snapshot.users), len(snapshot.posts), len(snapshot.comments))
+                path = self.path(f"snapshot-{number}.jsonl")
+                SocialNetworkSerializer.save_to_jsonl(snapshot, path)
+                loaded = SocialNetworkSerializer.load_from_jsonl(path)
+
+                self.assertEqual((len(loaded.users), len(loaded.posts), len(loaded.comments)), sizes)
+                self.assertTrue(loaded.integrity_report.ok)
+                with self.assertRaises(SocialNetworkError):
+                    snapshot.add_user(-1, "x", "x@example.com")
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(sn.posts_between(user_id=3)), len(sn.users[3].posts))
+
+    def test28_snapshots_share_layers(self):
+        """Снимки не видят последующих записей, а таблицы не копируются целиком"""
+        sn = make_network(ConcurrentSocialNetwork)
+        snapshots = []
+        for number in range(40):
+            snapshot = sn.snapshot()
+            snapshots.append((snapshot, snapshot.to_dict()))
+            sn.add_post(100_000 + number, number % 20, f"Пост {number}")
+            follower_id, followee_id = number % 20, (number * 7 + 1) % 20
+            if follower_id != followee_id and not sn.unfollow(follower_id, followee_id):
+                sn.follow(follower_id, followee_id)
+
+        for snapshot, expected in snapshots:
+            self.assertEqual(snapshot.to_dict(), expected)
+        self.assertLessEqual(len(sn.posts._layers), 8)
+        self.assertEqual(len(sn.posts), len(set(sn.posts)))
+
+
+class TestBenchmark(TempDirTestCase):
+    """Генератор сетей и замеры сериализации"""
+
+    def test35_generator_and_benchmark(self):
+        """Генератор воспроизводим по seed, замеры покрывают все пути и находят замедления"""
+        self.assertEqual(generate_data(10, seed=3), generate_data(10, seed=3))
+        self.assertNotEqual(generate_data(10, seed=3), generate_data(10, seed=4))
+        data = generate_data(5, seed=3, posts_per_user=2, posts_distribution='fixed', follows_per_user=1)
+        self.assertEqual((len(data['users']), len(data['posts'])), (5, 10))
+
+        results = serializer_benchmark(data, self.directory, repeat=1)
+        self.assertEqual({(row['path'], row['operation']) for row in results},
+                         {(name, operation) for name in serialization_paths(self.directory, data)
+                          for operation in ('save', 'load')})
+        slower = [{**row, 'seconds': row['seconds'] * 2 + 1} for row in results]
+        self.assertEqual(len(compare_with_baseline(slower, results, tolerance=0.2)), len(results))
+        self.assertEqual(compare_with_baseline(results, results, tolerance=0.2), [])
+
+
+class TestSQLite(TempDirTestCase):
+    """Хранение в SQLite и ленивое представление сети"""
+
+    def setUp(self):
+        super().setUp()
+        self.sn = make_network()
+        self.storage = SQLiteStorage(self.path("network.db"))
+        self.addCleanup(self.storage.close)
+        self.storage.save(self.sn)
+
+    def test20_storage_queries(self):
+        """Запросы хранилища по id, пользователю и времени"""
+        post = next(iter(self.sn.posts.values()))
+        self.assertEqual(self.storage.get_post(post.post_id).text, post.text)
+        self.assertIsNone(self.storage.get_user(-1))
+        self.assertEqual([p.post_id for p in self.storage.posts_by_user(post.user_id)],
+                         [p.post_id for p in self.sn.posts_between(user_id=post.user_id)])
+        self.assertEqual([p.post_id for p in self.storage.posts_between()],
+                         [p.post_id for p in self.sn.posts_between()])
+
+    def test21_lazy_network(self):
+        """Ленивая сеть: те же данные и запросы, запись сразу в базу"""
+        network = self.storage.open_network()
+        self.addCleanup(network.close)
+        self.assertEqual(summary(network, follows=False), summary(self.sn, follows=False))
+        self.assertEqual(network.find_user_by_email("USER_2@example.com").user_id, 2)
+
+        user_ids = [1, 2, 3]
+        self.assertEqual([p.post_id for p in network.feed(user_ids, limit=5)[0]],
+                         [p.post_id for p in self.sn.feed(user_ids, limit=5)[0]])
+
+        with network.batch():
+            network.add_post(50_000, 1, "Пост из ленивой сети")
+        self.assertEqual(self.storage.get_post(50_000).text, "Пост из ленивой сети")
+        self.assertIn(50_000, [p.post_id for p in network.users[1].posts])
+
+    def test27_lazy_network_threads(self):
+        """Ленивая сеть читается из нескольких потоков, пока другой пишет в batch()"""
+        network = self.storage.open_network()
+        self.addCleanup(network.close)
+        with self.assertRaises(SocialNetworkError):
+            del network.posts[next(iter(self.sn.posts))]
+
+        expected = {user_id: sorted(p.post_id for p in user.posts) for user_id, user in self.sn.users.items()}
+        errors = []
+
+        def read():
+            try:
+                for _ in range(20):
+                    for user_id, post_ids in expected.items():
+                        posts = network.posts_between(user_id=user_id)
+                        self.assertEqual(sorted(p.post_id for p in posts if p.post_id < 50_000), post_ids)
+                        self.assertEqual(network.find_user_by_username(f"user_{user_id}").user_id, user_id)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        with network.batch():
+            for post_id in range(50_000, 50_200):
+                network.add_post(post_id, 1, "Пост из ленивой сети")
+                self.assertIn(post_id, network.posts)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(network.posts), len(self.sn.posts) + 200)
+
+    def test30_lazy_rollback(self):
+        """Откат batch() убирает вставленные объекты из кэша ленивой сети"""
+        network = self.storage.open_network()
+        user = network.users[1]
+        posts_before = [p.post_id for p in user.posts]
+        with self.assertRaises(RuntimeError), network.batch():
+            network.add_user(90_001, "rolled_back", "rolled_back@example.com")
+            network.add_post(90_050, 1, "Пост из отмененной транзакции")
+            raise RuntimeError("отмена")
+        self.assertNotIn(90_001, network.users)
+        self.assertNotIn(90_050, network.posts)
+        self.assertEqual([p.post_id for p in network.users[1].posts], posts_before)
+        self.assertEqual(len(network.posts), len(self.sn.posts))
+
+    def test31_lazy_bulk_conflicts(self):
+        """bulk_add ленивой сети сообщает о занятых в базе именах и email вместе с другими ошибками"""
+        network = self.storage.open_network()
+        taken = network.users[1]
+        with self.assertRaises(BulkIngestError) as caught:
+            network.bulk_add(users=[(90_001, taken.username, "new@example.com"),
+                                    (90_002, "new_user", taken.email.upper()),
+                                    (90_003, "", "empty@example.com")])
+        self.assertEqual(len(caught.exception.errors), 3)
+        self.assertNotIn(90_002, network.users)
+        self.assertEqual(network.bulk_add(users=[(1, taken.username, taken.email)]), (1, 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
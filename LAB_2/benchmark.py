@@ -0,0 +1,90 @@
+"""Замер скорости поиска валютных сумм на больших текстах.
+
+Запуск: python benchmark.py [--copies 2000] [--repeat 3] [--workers 1 2 4] [--range-size 1048576]
+Текст - sample_data.txt, повторенный copies раз. Для сравнения оставлен
+прежний путь: совпадение регулярного выражения разбирается заново
+через _parse_currency_amount. Файловые варианты читают тот же текст из
+временного файла; scan_paths делит его на диапазоны по --range-size байт
+и обрабатывает их пулом из --workers процессов.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from main import CurrencyChecker
+
+
+def legacy_find(checker, text):
+    """Прежний алгоритм: повторный разбор каждой найденной строки"""
+    matches = []
+    for match in checker.currency_pattern.finditer(text):
+        amount, currency = checker._parse_currency_amount(match.group(0))
+        if currency and amount:
+            matches.append((currency, amount))
+    return matches
+
+
+def scan_matches(checker, path, workers, range_size):
+    """Все суммы из пакетной обработки одним списком"""
+    result = checker.scan_paths(path, workers=workers, range_size=range_size)
+    return [match for matches in result.files.values() for match in matches]
+
+
+def measure(function, source, repeat):
+    """Лучшее время из repeat запусков и число найденных сумм"""
+    best, found = float('inf'), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        found = sum(1 for _ in function(source))
+        best = min(best, time.perf_counter() - start)
+    return best, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость поиска валютных сумм")
+    parser.add_argument('--copies', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, nargs='+', default=(1, os.cpu_count()))
+    parser.add_argument('--range-size', type=int, default=1 << 20)
+    args = parser.parse_args()
+
+    sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample_data.txt')
+    with open(sample, 'r', encoding='utf-8') as f:
+        text = f.read() * args.copies
+    size_mb = len(text.encode('utf-8')) / 2 ** 20
+
+    checker = CurrencyChecker()
+    text_variants = {
+        'прежний разбор': lambda t: legacy_find(checker, t),
+        'find_currency_amounts': checker.find_currency_amounts,
+        'find_currency_matches': checker.find_currency_matches,
+    }
+    file_variants = {
+        'iter_file_matches': checker.iter_file_matches,
+        'iter_mapped_matches': checker.iter_mapped_matches,
+    }
+
+    print(f"Текст: {size_mb:.1f} МБ\n")
+    print(f"{'вариант':<24}{'время, с':>10}{'МБ/с':>10}{'сумм/с':>12}")
+
+    def report(name, function, source):
+        seconds, found = measure(function, source, args.repeat)
+        print(f"{name:<24}{seconds:>10.3f}{size_mb / seconds:>10.2f}{found / seconds:>12.0f}")
+
+    for name, function in text_variants.items():
+        report(name, function, text)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'data.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        for name, function in file_variants.items():
+            report(name, function, path)
+        for workers in dict.fromkeys(args.workers):
+            report(f"scan_paths, {workers} проц.", lambda p, w=workers: scan_matches(checker, p, w, args.range_size),
+                   path)
+
+
+if __name__ == "__main__":
+    main()
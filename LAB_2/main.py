@@ -1,34 +1,200 @@
+import glob
+import mmap
+import os
 import re
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from decimal import Decimal
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Расширенное регулярное выражение для поиска валютных сумм.
+# Именованные группы сразу дают валюту и сумму, повторный разбор не нужен.
+# Пробелов между валютой и суммой не больше 32, групп разрядов не больше 8:
+# длина совпадения ограничена, и файл можно читать частями с небольшим перекрытием.
+# Опережающая проверка первого символа отсеивает позиции без цифры и без
+# начала валюты до перебора вариантов
+CURRENCY_PATTERN = re.compile(
+    r'''
+    (?=[\dUEARGJCKB$€£¥₽])       # Первый символ: цифра или начало валюты
+    (?:                         # Незахватывающая группа для вариантов
+        (?P<prefix>USD|EUR|RUB|GBP|JPY|CNY|CHF|CAD|AUD|UAH|KZT|BYN|₽|\$|€|£|¥)\s{0,32} # Валюта перед суммой
+        (?P<amount>
+            \d{1,3}(?:,\d{3}){0,8} # Целая часть с разделителями тысяч
+            (?:\.\d{1,2})?         # Дробная часть
+        )
+    |
+        (?P<amount_before>
+            \d{1,3}(?:,\d{3}){0,8} # Целая часть с разделителями тысяч
+            (?:\.\d{1,2})?         # Дробная часть
+        )
+        \s{0,32}(?P<suffix>USD|EUR|RUB|GBP|JPY|CNY|CHF|CAD|AUD|UAH|KZT|BYN|₽|\$|€|£|¥) # Валюта после суммы
+    )
+    ''',
+    re.VERBOSE | re.IGNORECASE
+)
+
+# То же выражение для байтов UTF-8 (поиск по mmap без декодирования файла).
+# Символы валют записаны байтовыми последовательностями UTF-8; \s дополнен
+# юникодными пробелами (неразрывный, узкий и т.п.), как в строковой версии.
+# Цифры - только ASCII. Как и в строковой версии, позиции отсеиваются по
+# первому байту; многобайтовые пробелы перебираются только после ведущего
+# байта \xc2/\xe1-\xe3, иначе ветки перебирались бы вокруг каждой суммы
+_UTF8_SPACE = (rb'(?:[\s\x1c-\x1f]|(?=[\xc2\xe1-\xe3])(?:\xc2[\x85\xa0]|\xe1\x9a\x80'
+               rb'|\xe2\x80[\x80-\x8a\xa8\xa9\xaf]|\xe2\x81\x9f|\xe3\x80\x80)){0,32}')
+_UTF8_CURRENCY = (rb'USD|EUR|RUB|GBP|JPY|CNY|CHF|CAD|AUD|UAH|KZT|BYN'
+                  rb'|\xe2\x82\xbd|\$|\xe2\x82\xac|\xc2\xa3|\xc2\xa5')   # ₽ $ € £ ¥
+_UTF8_AMOUNT = rb'\d{1,3}(?:,\d{3}){0,8}(?:\.\d{1,2})?'
+CURRENCY_PATTERN_BYTES = re.compile(
+    rb'(?=[\dUEARGJCKB$\xc2\xe2])'
+    rb'(?:(?P<prefix>' + _UTF8_CURRENCY + rb')' + _UTF8_SPACE + rb'(?P<amount>' + _UTF8_AMOUNT + rb')'
+    rb'|(?P<amount_before>' + _UTF8_AMOUNT + rb')' + _UTF8_SPACE + rb'(?P<suffix>' + _UTF8_CURRENCY + rb'))',
+    re.IGNORECASE
+)
+
+_AMOUNT_PATTERN = re.compile(r'^\d+(?:\.\d{1,2})?$')
+
+# Верхняя граница длины совпадения (в символах и в байтах UTF-8) с запасом
+# на просмотр одного символа после него: код валюты, 32 пробела до 3 байт,
+# сумма из 3 цифр, 8 групп разрядов и дробной части. Совпадение, которое
+# начинается раньше последних MATCH_OVERLAP символов текста, уже не изменится
+# при дочитывании файла
+MATCH_OVERLAP = 3 + 32 * 3 + 3 + 8 * 4 + 3 + 1
+
+# Размер части файла при потоковом чтении, в символах
+CHUNK_SIZE = 1 << 20
+
+# Размер диапазона большого файла для одного процесса при пакетной обработке, в байтах
+RANGE_SIZE = 16 << 20
+
+# Загрузка страниц: таймаут запроса в секундах, число потоков, одновременных
+# запросов к одному хосту и повторов при сетевых ошибках и ответах 429/5xx
+HTTP_TIMEOUT = 10
+HTTP_WORKERS = 8
+HTTP_PER_HOST = 2
+HTTP_RETRIES = 2
+
+# Символ валюты -> код
+CURRENCY_SYMBOLS = {
+    '$': 'USD',
+    '€': 'EUR',
+    '£': 'GBP',
+    '¥': 'JPY',
+    '₽': 'RUB'
+}
+
+
+class CurrencyMatch(NamedTuple):
+    """Найденная сумма: ISO-код, сумма и смещения [start, end) в тексте"""
+    currency: str
+    amount: Decimal
+    start: int
+    end: int
+
+
+class UrlResult(NamedTuple):
+    """Результат загрузки страницы: суммы как у find_currency_amounts или текст ошибки"""
+    url: str
+    amounts: list
+    error: str = None
+
+
+class ScanResult(NamedTuple):
+    """Результат пакетной обработки: файл -> суммы, валюта -> итог и ошибки чтения"""
+    files: dict
+    totals: dict
+    errors: dict
+
+
+# Символ валюты в UTF-8 -> код (для поиска по байтам без декодирования)
+_CURRENCY_SYMBOLS_BYTES = {symbol.encode('utf-8'): code for symbol, code in CURRENCY_SYMBOLS.items()}
+
+
+def _currency_code(token: str) -> str:
+    return CURRENCY_SYMBOLS.get(token) or token.upper()
+
+
+def _currency_code_bytes(token: bytes) -> str:
+    return _CURRENCY_SYMBOLS_BYTES.get(token) or token.upper().decode('ascii')
+
+
+def _read_range(filename, scan_from: int, end: int) -> list:
+    """Совпадения в байтах файла, которые начинаются в [scan_from, end).
+
+    Поиск идет до end + MATCH_OVERLAP, чтобы совпадение на границе было
+    найдено целиком, но не дальше - объем работы не зависит от содержимого
+    файла после диапазона.
+    """
+    with open(filename, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            return []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            scan = CurrencyChecker()._scan_bytes(buffer, scan_from, min(len(buffer), end + MATCH_OVERLAP))
+            return [match for match in scan if match[2] < end]
+
+
+def _scan_range(task):
+    """Суммы из байтового диапазона [start, end) файла (выполняется в процессе пула).
+
+    Поиск начинается за MATCH_OVERLAP байт до start: совпадение, начатое в
+    предыдущем диапазоне, находится и здесь. Повторы отбрасывает _merge.
+    """
+    filename, start, end = task
+    try:
+        return filename, start, end, _read_range(filename, max(0, start - MATCH_OVERLAP), end)
+    except OSError as e:
+        return filename, start, end, e
+
+
+def make_session(pool_size=HTTP_WORKERS, retries=HTTP_RETRIES, backoff=0.5):
+    """Сессия requests с пулом keep-alive соединений и повторами запросов"""
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=('GET',), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _page_text(content):
+    """Текст HTML-страницы без скриптов и стилей"""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Удаляем скрипты и стили чтобы получить чистый текст
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    # Получаем чистый текст страницы
+    return soup.get_text()
+
+
+def _collect_files(paths):
+    """Файлы по списку путей: каталоги обходятся рекурсивно, маски раскрываются через glob"""
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.update(os.path.join(root, name) for name in names)
+        elif glob.has_magic(path):
+            files.update(name for name in glob.glob(path, recursive=True) if os.path.isfile(name))
+        else:
+            files.add(path)
+    return sorted(files)
 
 
 class CurrencyChecker:
     def __init__(self):
-        # Расширенное регулярное выражение для поиска валютных сумм
-        self.currency_pattern = re.compile(
-            r'''
-            (?:                         # Незахватывающая группа для вариантов
-                (?:USD|EUR|RUB|GBP|JPY|CNY|CHF|CAD|AUD|UAH|KZT|BYN|₽|\$|€|£|¥)\s* # Валюта перед суммой
-                \d{1,3}(?:,\d{3})*     # Целая часть с разделителями тысяч
-                (?:\.\d{1,2})?         # Дробная часть 
-            |
-                \d{1,3}(?:,\d{3})*     # Целая часть с разделителями тысяч
-                (?:\.\d{1,2})?         # Дробная часть 
-                \s*(?:USD|EUR|RUB|GBP|JPY|CNY|CHF|CAD|AUD|UAH|KZT|BYN|₽|\$|€|£|¥) # Валюта после суммы
-            )
-            ''',
-            re.VERBOSE | re.IGNORECASE
-        )
+        self.currency_pattern = CURRENCY_PATTERN
 
         # Словарь символов валют и их кодов
-        self.currency_symbols = {
-            '$': 'USD',
-            '€': 'EUR',
-            '£': 'GBP',
-            '¥': 'JPY',
-            '₽': 'RUB'
-        }
+        self.currency_symbols = CURRENCY_SYMBOLS
 
         # Полный список поддерживаемых валют
         self.supported_currencies = [
@@ -37,15 +203,157 @@ class CurrencyChecker:
         ]
 
     def find_currency_amounts(self, text):
-        """Находит все валютные суммы в тексте"""
-        matches = []
+        """Находит все валютные суммы в тексте: список пар (код валюты, сумма строкой)"""
+        return [(currency, amount) for currency, amount, _, _ in self._scan(text)]
+
+    def find_currency_matches(self, text):
+        """Находит все валютные суммы в тексте: список CurrencyMatch"""
+        return list(self.iter_currency_matches(text))
+
+    def iter_currency_matches(self, text, offset=0):
+        """Генератор CurrencyMatch за один проход регулярного выражения.
+
+        offset прибавляется к позициям (используется при чтении файла по частям).
+        Разбор совпадения встроен в цикл, без промежуточного генератора _scan.
+        """
+        make = CurrencyMatch._make
         for match in self.currency_pattern.finditer(text):
-            amount_str = match.group(0)
-            # Извлекаем валюту и сумму
-            currency, amount = self._parse_currency_amount(amount_str)
-            if currency and amount:
-                matches.append((amount, currency))
-        return matches
+            prefix, amount, amount_before, suffix = match.groups()
+            if prefix is None:
+                prefix, amount = suffix, amount_before
+            start, end = match.span()
+            yield make((_currency_code(prefix), Decimal(amount.replace(',', '')), start + offset, end + offset))
+
+    def iter_file_matches(self, filename, chunk_size=CHUNK_SIZE):
+        """Генератор CurrencyMatch по файлу, читаемому частями по chunk_size символов.
+
+        Позиции считаются в символах от начала файла. Память не зависит от
+        размера файла.
+        """
+        make = CurrencyMatch._make
+        with open(filename, 'r', encoding='utf-8') as file:
+            for currency, amount, start, end in self._scan_stream(file, chunk_size):
+                yield make((currency, Decimal(amount), start, end))
+
+    def iter_mapped_matches(self, filename):
+        """Генератор CurrencyMatch по файлу в UTF-8 через mmap.
+
+        Выражение CURRENCY_PATTERN_BYTES выполняется прямо над отображенным
+        в память файлом, декодируются только найденные фрагменты. Позиции -
+        в байтах от начала файла.
+        """
+        with open(filename, 'rb') as file:
+            if not os.fstat(file.fileno()).st_size:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                make = CurrencyMatch._make
+                for currency, amount, start, end in self._scan_bytes(buffer):
+                    yield make((currency, Decimal(amount), start, end))
+
+    def _scan_bytes(self, buffer, start=0, end=None):
+        """_scan для байтов UTF-8 в диапазоне [start, end)"""
+        matches = CURRENCY_PATTERN_BYTES.finditer(buffer, start, len(buffer) if end is None else end)
+        for match in matches:
+            prefix, amount, amount_before, suffix = match.groups()
+            if prefix is None:
+                prefix, amount = suffix, amount_before
+            start, end = match.span()
+            yield _currency_code_bytes(prefix), amount.replace(b',', b'').decode('ascii'), start, end
+
+    def scan_paths(self, paths, workers=None, range_size=RANGE_SIZE):
+        """Пакетный поиск по файлам, каталогам и маскам glob в пуле процессов.
+
+        Файлы больше range_size делятся на байтовые диапазоны, которые
+        обрабатываются независимо. workers=1 - без пула, в текущем процессе.
+        Позиции в результате - в байтах от начала файла.
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        tasks = []
+        for filename in _collect_files(paths):
+            try:
+                size = os.path.getsize(filename)
+            except OSError:
+                size = 0   # ошибку сообщит _scan_range
+            if not size:
+                tasks.append((filename, 0, 0))
+            tasks.extend((filename, start, min(start + range_size, size))
+                         for start in range(0, size, range_size))
+
+        if workers == 1:
+            return self._merge(map(_scan_range, tasks))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return self._merge(executor.map(_scan_range, tasks))
+
+    @staticmethod
+    def _merge(parts):
+        """Объединение результатов диапазонов (по порядку в файле) в ScanResult.
+
+        Из диапазона берутся совпадения не раньше конца последнего принятого.
+        Если совпадение диапазона перекрывает этот конец, поиск в перекрытии
+        начался внутри чужой суммы и мог разойтись со сплошным проходом - такой
+        диапазон просматривается заново от конца последнего совпадения.
+        """
+        files, totals, errors = {}, {}, {}
+        for filename, start, end, found in parts:
+            matches = files.get(filename)
+            position = matches[-1].end if matches else 0
+            if not isinstance(found, OSError) and any(
+                    match_start < position < match_end for _, _, match_start, match_end in found):
+                try:
+                    found = _read_range(filename, position, end)
+                except OSError as e:
+                    found = e
+            if isinstance(found, OSError):
+                errors[filename] = str(found)
+                continue
+            matches = files.setdefault(filename, [])
+            for currency, amount, match_start, match_end in found:
+                if match_start < position:
+                    continue
+                amount = Decimal(amount)
+                matches.append(CurrencyMatch(currency, amount, match_start, match_end))
+                totals[currency] = totals.get(currency, Decimal(0)) + amount
+        return ScanResult(files, dict(sorted(totals.items())), errors)
+
+    def _scan_stream(self, stream, chunk_size=CHUNK_SIZE):
+        """_scan для текстового потока, читаемого частями.
+
+        Из буфера выдаются только совпадения, которые начинаются раньше его
+        последних MATCH_OVERLAP символов. Остаток - от конца последнего
+        выданного совпадения или от этой границы - переносится в начало
+        следующей части, поэтому сумма на стыке не теряется и не находится
+        дважды, а буфер не больше chunk_size + MATCH_OVERLAP символов.
+        """
+        offset, tail = 0, ''
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            buffer = tail + chunk
+            limit = len(buffer) - MATCH_OVERLAP
+            if limit <= 0:
+                tail = buffer
+                continue
+            cut = limit
+            for currency, amount, start, end in self._scan(buffer):
+                if start >= limit:
+                    break
+                yield currency, amount, start + offset, end + offset
+                cut = max(cut, end)
+            offset += cut
+            tail = buffer[cut:]
+        for currency, amount, start, end in self._scan(tail):
+            yield currency, amount, start + offset, end + offset
+
+    def _scan(self, text):
+        """Валюта и сумма (без разделителей тысяч) из именованных групп каждого совпадения"""
+        for match in self.currency_pattern.finditer(text):
+            prefix, amount, amount_before, suffix = match.groups()
+            if prefix is None:
+                prefix, amount = suffix, amount_before
+            start, end = match.span()
+            yield _currency_code(prefix), amount.replace(',', ''), start, end
 
     def _parse_currency_amount(self, amount_str):
         """Парсит строку с валютной суммой на составляющие"""
@@ -64,10 +372,11 @@ class CurrencyChecker:
 
         # Если не нашли символ, ищем текстовые обозначения
         if currency is None:
+            upper = amount_str.upper()
             for curr_code in self.supported_currencies:
-                if curr_code.upper() in amount_str.upper():
+                if curr_code in upper:
                     currency = curr_code
-                    amount_str = amount_str.upper().replace(curr_code.upper(), '').strip()
+                    amount_str = upper.replace(curr_code, '').strip()
                     break
 
         # Очищаем сумму от запятых
@@ -85,39 +394,106 @@ class CurrencyChecker:
             return False
 
         # Проверяем формат: целое число или число с плавающей точкой
-        amount_pattern = re.compile(r'^\d+(?:\.\d{1,2})?$')
-        return amount_pattern.match(amount_str) is not None
+        return _AMOUNT_PATTERN.match(amount_str) is not None
 
     def get_supported_currencies(self):
         """Возвращает список поддерживаемых валют"""
         return self.supported_currencies
 
-    def get_currency_from_url(self, url):
+    def get_currency_from_url(self, url, session=None, timeout=HTTP_TIMEOUT):
         """Загружает текст с веб-страницы и ищет валютные суммы"""
 
         print(f"🔄 Загружаю страницу: {url}")
-        response = requests.get(url)
+        response = (session or requests).get(url, timeout=timeout)
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Удаляем скрипты и стили чтобы получить чистый текст
-        for script in soup(["script", "style"]):
-            script.decompose()
-
-        # Получаем чистый текст страницы
-        page_text = soup.get_text()
+        page_text = _page_text(response.content)
 
         print(f"📄 Размер текста: {len(page_text)} символов")
 
         return self.find_currency_amounts(page_text)
 
+    def iter_currency_from_urls(self, urls, workers=HTTP_WORKERS, per_host=HTTP_PER_HOST,
+                                timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES, session=None):
+        """Параллельная загрузка страниц: генератор UrlResult в порядке готовности.
+
+        Запросы выполняет пул из workers потоков через общую сессию с
+        keep-alive соединениями. Очереди адресов ведутся по хостам: запрос
+        отправляется в пул, только когда у его хоста меньше per_host
+        запросов в работе, поэтому длинная очередь к одному хосту не занимает
+        потоки, нужные остальным. Разбор загруженной страницы - отдельная
+        задача пула, слот хоста на нее не тратится. Ошибка загрузки или
+        разбора не прерывает обработку остальных страниц и возвращается в
+        UrlResult.error.
+        """
+        queues = {}
+        for url in urls:
+            queues.setdefault(urlsplit(url).netloc, deque()).append(url)
+        active = dict.fromkeys(queues, 0)
+        own_session = session is None
+        if own_session:
+            session = make_session(workers, retries)
+
+        def download(url):
+            response = session.get(url, timeout=timeout)
+            response.raise_for_status()
+            return response.content
+
+        def parse(url, content):
+            return UrlResult(url, self.find_currency_amounts(_page_text(content)))
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        running = {}   # задача -> (url, хост загрузки или None для разбора)
+
+        def submit_downloads():
+            # По одному адресу с каждого свободного хоста за проход, пока есть потоки
+            while len(running) < workers:
+                submitted = False
+                for host, queue in queues.items():
+                    if queue and active[host] < per_host and len(running) < workers:
+                        url = queue.popleft()
+                        running[executor.submit(download, url)] = url, host
+                        active[host] += 1
+                        submitted = True
+                if not submitted:
+                    break
+
+        try:
+            submit_downloads()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, host = running.pop(future)
+                    if host is not None:
+                        active[host] -= 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # Любая ошибка страницы (сеть, разбор HTML) не должна прерывать весь пакет
+                        yield UrlResult(url, [], str(e))
+                        continue
+                    if host is None:
+                        yield result
+                    else:
+                        running[executor.submit(parse, url, result)] = url, None
+                submit_downloads()
+        finally:
+            # Генератор могли закрыть досрочно - оставшиеся запросы не нужны
+            executor.shutdown(cancel_futures=True)
+            if own_session:
+                session.close()
+
+    def get_currency_from_urls(self, urls, **options):
+        """Параллельная загрузка страниц: словарь url -> UrlResult в исходном порядке"""
+        urls = list(urls)
+        results = {result.url: result for result in self.iter_currency_from_urls(urls, **options)}
+        return {url: results[url] for url in urls}
+
     def process_file(self, filename):
         """Читает файл и ищет валютные суммы"""
         try:
             with open(filename, 'r', encoding='utf-8') as file:
-                content = file.read()
-            return self.find_currency_amounts(content)
+                return [(currency, amount) for currency, amount, _, _ in self._scan_stream(file)]
         except FileNotFoundError:
             print(f"Файл {filename} не найден")
             return []
@@ -135,8 +511,9 @@ def main():
     print("1 - Поиск в тексте")
     print("2 - Загрузить из файла")
     print("3 - Загрузить по URL")
+    print("4 - Обработать каталог или маску файлов")
 
-    choice = input("Ваш выбор (1-3): ").strip()
+    choice = input("Ваш выбор (1-4): ").strip()
 
     if choice == '1':
         # Поиск в тексте
@@ -162,14 +539,37 @@ def main():
 
     elif choice == '3':
         # Загрузка по URL
-        url = input("Введите URL: ")
-        amounts = checker.get_currency_from_url(url)
+        urls = input("Введите URL (несколько - через пробел): ").split()
+        if len(urls) > 1:
+            for result in checker.iter_currency_from_urls(urls):
+                if result.error:
+                    print(f"❌ {result.url}: {result.error}")
+                    continue
+                print(f"✅ {result.url}: найдено сумм: {len(result.amounts)}")
+                for amount, currency in result.amounts:
+                    print(f"- {amount} {currency}")
+            return
+        amounts = checker.get_currency_from_url(urls[0]) if urls else []
         if amounts:
             print("Найденные валютные суммы:")
             for amount, currency in amounts:
                 print(f"- {amount} {currency}")
         else:
             print("Валютные суммы не найдены")
+    elif choice == '4':
+        # Пакетная обработка в пуле процессов
+        path = input("Введите каталог или маску (например, logs/**/*.txt): ")
+        result = checker.scan_paths(path)
+        for filename, error in result.errors.items():
+            print(f"Ошибка при чтении файла {filename}: {error}")
+        found = sum(len(matches) for matches in result.files.values())
+        print(f"Файлов: {len(result.files)}, найдено сумм: {found}")
+        if result.totals:
+            print("Итого по валютам:")
+            for currency, total in result.totals.items():
+                print(f"- {total} {currency}")
+        else:
+            print("Валютные суммы не найдены")
     else:
         print("Неверный выбор")
 
@@ -1,5 +1,45 @@
+import io
+import os
+import tempfile
+import threading
+import time
 import unittest
-from main import CurrencyChecker
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from decimal import Decimal
+
+from main import CurrencyChecker, CurrencyMatch, MATCH_OVERLAP, _scan_range, make_session
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Локальный сервер для тестов загрузки: /page<N>, /slow<N> (ответ через 0.2 с),
+    /flaky (сначала 503), остальное - 404"""
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.path)
+        if self.path.startswith('/slow'):
+            time.sleep(0.2)
+            self._reply(200, "<p>Медленно: 1 USD</p>")
+        elif self.path.startswith('/page'):
+            number = self.path[len('/page'):]
+            self._reply(200, f"<html><script>var x = '$999';</script><p>Цена: ${number}00</p></html>")
+        elif self.path == '/flaky' and self.requests_seen.count('/flaky') == 1:
+            self._reply(503, "занято")
+        elif self.path == '/flaky':
+            self._reply(200, "<p>Итого 5 EUR</p>")
+        else:
+            self._reply(404, "нет")
+
+    def _reply(self, status, body):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
 
 
 class TestCurrencyCheckerSimple(unittest.TestCase):
@@ -8,6 +48,14 @@ class TestCurrencyCheckerSimple(unittest.TestCase):
     def setUp(self):
         self.checker = CurrencyChecker()
 
+    def start_server(self):
+        """Локальный PageHandler в отдельном потоке; возвращает базовый адрес"""
+        server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_port}"
+
     def test1_basic_currencies(self):
         """Базовые валюты"""
         text = "$100, 50 EUR, ₽1,500"
@@ -48,6 +96,162 @@ class TestCurrencyCheckerSimple(unittest.TestCase):
         self.assertTrue(self.checker._is_valid_amount("100.50"))
         self.assertFalse(self.checker._is_valid_amount("100.123"))
 
+    def test8_typed_matches(self):
+        """Типизированные совпадения с позициями"""
+        text = "Итого: $1,250.50 и 30 eur"
+        results = self.checker.find_currency_matches(text)
+        self.assertEqual(results, [
+            CurrencyMatch("USD", Decimal("1250.50"), 7, 16),
+            CurrencyMatch("EUR", Decimal("30"), 19, 25),
+        ])
+        self.assertEqual(text[results[0].start:results[0].end], "$1,250.50")
+
+    def test9_chunked_file(self):
+        """Чтение файла по частям не теряет и не дублирует суммы на стыках"""
+        text = "Счет: $1,250.50; оплата 30 EUR, остаток ₽ 7,000 и 15\nGBP.\n" * 20
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'data.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            expected = self.checker.find_currency_matches(text)
+            for chunk_size in (1, 3, 16, 1 << 20):
+                results = list(self.checker.iter_file_matches(path, chunk_size))
+                self.assertEqual(results, expected)
+            self.assertEqual(self.checker.process_file(path), self.checker.find_currency_amounts(text))
+
+    def test10_mapped_file(self):
+        """Поиск по mmap: те же суммы, позиции в байтах"""
+        text = "Цена ₽1,500 и 20\u00a0€; итого £7.25"
+        data = text.encode('utf-8')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'data.txt')
+            with open(path, 'wb') as f:
+                f.write(data)
+            results = list(self.checker.iter_mapped_matches(path))
+            self.assertEqual([(m.currency, m.amount) for m in results],
+                             [(m.currency, m.amount) for m in self.checker.find_currency_matches(text)])
+            self.assertEqual(data[results[0].start:results[0].end].decode('utf-8'), "₽1,500")
+            self.assertEqual(data[results[1].start:results[1].end].decode('utf-8'), "20\u00a0€")
+
+    def test11_scan_paths(self):
+        """Пакетная обработка каталога: диапазоны файлов и итоги по валютам"""
+        text = "Счет: $1,250.50; оплата 30 EUR, остаток ₽ 7,000 и 15\nGBP.\n" * 50
+        with tempfile.TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, 'sub'))
+            for name in ('a.txt', os.path.join('sub', 'b.txt')):
+                with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+                    f.write(text)
+            expected = list(self.checker.iter_mapped_matches(os.path.join(directory, 'a.txt')))
+            for workers, range_size in ((1, 7), (2, 100), (2, 1 << 20)):
+                result = self.checker.scan_paths(directory, workers=workers, range_size=range_size)
+                self.assertEqual(len(result.files), 2)
+                for matches in result.files.values():
+                    self.assertEqual(matches, expected)
+                self.assertEqual(result.totals, {'EUR': Decimal(3000), 'GBP': Decimal(1500),
+                                                 'RUB': Decimal(700000), 'USD': Decimal('125050.00')})
+            pattern = os.path.join(directory, '**', 'b.txt')
+            self.assertEqual(list(self.checker.scan_paths(pattern, workers=1).files),
+                             [os.path.join(directory, 'sub', 'b.txt')])
+
+    def test12_fetch_urls(self):
+        """Параллельная загрузка страниц с повтором и ошибками"""
+        base = self.start_server()
+
+        urls = [f"{base}/page{number}" for number in range(1, 6)] + [f"{base}/flaky", f"{base}/missing"]
+        results = self.checker.get_currency_from_urls(urls, workers=4, per_host=2, timeout=5, retries=1)
+        self.assertEqual(list(results), urls)
+        for number in range(1, 6):
+            self.assertEqual(results[f"{base}/page{number}"].amounts, [("USD", f"{number}00")])
+        self.assertEqual(results[f"{base}/flaky"].amounts, [("EUR", "5")])
+        self.assertIsNone(results[f"{base}/flaky"].error)
+        self.assertIn("404", results[f"{base}/missing"].error)
+
+    def test13_fetch_unexpected_error(self):
+        """Ошибка не из requests попадает в UrlResult.error, остальные страницы загружаются"""
+        base = self.start_server()
+
+        class BrokenSession:
+            """Сессия, которая падает с ValueError на /broken"""
+            def __init__(self):
+                self.session = make_session(2, 0)
+
+            def get(self, url, **options):
+                if url.endswith('/broken'):
+                    raise ValueError("сбой обработки")
+                return self.session.get(url, **options)
+
+        session = BrokenSession()
+        self.addCleanup(session.session.close)
+        urls = [f"{base}/page1", f"{base}/broken", f"{base}/page2"]
+        results = self.checker.get_currency_from_urls(urls, workers=2, timeout=5, session=session)
+        self.assertEqual(results[f"{base}/page1"].amounts, [("USD", "100")])
+        self.assertEqual(results[f"{base}/page2"].amounts, [("USD", "200")])
+        self.assertEqual(results[f"{base}/broken"].amounts, [])
+        self.assertEqual(results[f"{base}/broken"].error, "сбой обработки")
+
+
+    def test14_chunked_numeric_file(self):
+        """Файл только из цифр и разделителей читается с ограниченным перекрытием"""
+        text = "$1 " + "123,246.5,4\n" * 2000 + "7 EUR"
+        stream = io.StringIO(text)
+        results = self.checker._scan_stream(stream, 64)
+        self.assertEqual(next(results), ("USD", "1", 0, 2))
+        self.assertLess(stream.tell(), 1024)
+        self.assertEqual(list(results), [("EUR", "7", len(text) - 5, len(text))])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'data.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            for chunk_size in (7, 64, 1 << 20):
+                self.assertEqual(list(self.checker.iter_file_matches(path, chunk_size)),
+                                 self.checker.find_currency_matches(text))
+
+
+    def test15_ranges_without_boundaries(self):
+        """Диапазоны файла без разделителей: параллельная работа и точный стык"""
+        text = "x" + "USD 100 USD " + ("123,246.5,4\n" * 300 + "5 USD 100 USD 7 EUR ") * 5
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'data.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            expected = list(self.checker.iter_mapped_matches(path))
+            for workers, range_size in ((1, MATCH_OVERLAP + 2), (1, 1000), (2, 4096)):
+                result = self.checker.scan_paths(path, workers=workers, range_size=range_size)
+                self.assertEqual(result.files[path], expected)
+            # Каждый диапазон просматривается только рядом со своими границами
+            _, start, end, found = _scan_range((path, 5000, 6000))
+            self.assertTrue(all(5000 - MATCH_OVERLAP <= match[2] < 6000 for match in found))
+
+
+    def test16_mapped_all_currencies(self):
+        """Байтовое выражение находит те же суммы, что и строковое, для всех валют и пробелов"""
+        tokens = ["$", "€", "£", "¥", "₽"] + self.checker.get_supported_currencies()
+        spaces = ["", " ", "\u00a0", "\u2009", "\u3000", "\u202f \u2002"]
+        parts = []
+        for number, token in enumerate(tokens):
+            space = spaces[number % len(spaces)]
+            parts.append(f"{token}{space}{number},250.5 и {number}{space}{token.lower()}; ")
+        text = "".join(parts)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'data.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            results = [(m.currency, m.amount) for m in self.checker.iter_mapped_matches(path)]
+        self.assertEqual(results, [(m.currency, m.amount) for m in self.checker.find_currency_matches(text)])
+        self.assertEqual(len(results), 2 * len(tokens))
+
+
+    def test17_fetch_per_host_queue(self):
+        """Очередь к медленному хосту не занимает потоки, нужные другому хосту"""
+        slow, fast = self.start_server(), self.start_server()
+        urls = [f"{slow}/slow{number}" for number in range(4)] + [f"{fast}/page{number}" for number in range(1, 4)]
+        results = self.checker.iter_currency_from_urls(urls, workers=4, per_host=1, timeout=5, retries=0)
+        first = [next(results).url for _ in range(3)]
+        self.assertEqual(sorted(first), urls[4:])
+        rest = list(results)
+        self.assertEqual(sorted(result.url for result in rest), urls[:4])
+        self.assertTrue(all(result.amounts == [("USD", "1")] for result in rest))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file